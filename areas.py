@@ -3,14 +3,19 @@ import random
 import grid
 import math
 
-# Initialize pygame font module
-pygame.font.init()
-
 # Color Constants
 AREA_COLOR = (206, 195, 188)
 PIN_COLOR = (51, 51, 51)
 PIN_TEXT_COLOR = (240, 235, 231)
-futuraltheavy_font = pygame.font.Font('FUTURALT-HEAVY.TTF', 10)
+futuraltheavy_font = None
+
+def get_pin_font():
+    """Load the pin font on first use so headless runs never initialize pygame.font."""
+    global futuraltheavy_font
+    if futuraltheavy_font is None:
+        pygame.font.init()
+        futuraltheavy_font = pygame.font.Font('FUTURALT-HEAVY.TTF', 10)
+    return futuraltheavy_font
 
 # Helper function to draw waiting pins at any grid position
 def draw_waiting_pin(screen, screen_position, count, font, color=PIN_COLOR):
@@ -42,9 +47,9 @@ def draw_waiting_pin(screen, screen_position, count, font, color=PIN_COLOR):
     screen.blit(text_surface, text_rect)
 
 class Area:
-    def __init__(self, grid_position):
+    def __init__(self, grid_position, grid_config=None):
         self.grid_position = grid_position  # (x, y) in grid coordinates
-        self.screen_position = grid.get_grid_coors(*grid_position)  # (x, y) in screen coordinates
+        self.screen_position = grid.get_grid_coors(*grid_position, grid_config)  # (x, y) in screen coordinates
         self.waiting_passengers = 0  # Count of passengers waiting at this area
     
     def update_waiting_count(self, count):
@@ -59,8 +64,8 @@ class Area:
         draw_waiting_pin(screen, self.screen_position, self.waiting_passengers, font)
 
 class ResidentialArea(Area):
-    def __init__(self, grid_position):
-        super().__init__(grid_position)
+    def __init__(self, grid_position, grid_config=None):
+        super().__init__(grid_position, grid_config)
     
     def draw(self, screen):
         """Draw a triangle representing a residential area."""
@@ -75,8 +80,8 @@ class ResidentialArea(Area):
         pygame.draw.polygon(screen, AREA_COLOR, [top_point, bottom_left, bottom_right], 3)
 
 class NonResidentialArea(Area):
-    def __init__(self, grid_position):
-        super().__init__(grid_position)
+    def __init__(self, grid_position, grid_config=None):
+        super().__init__(grid_position, grid_config)
     
     def draw(self, screen):
         """Draw a circle representing a non-residential area."""
@@ -84,21 +89,24 @@ class NonResidentialArea(Area):
         pygame.draw.circle(screen, AREA_COLOR, self.screen_position, 7.5, 3)
 
 class AreaManager:
-    def __init__(self, grid_size=17):
-        self.grid_size = grid_size
+    def __init__(self, grid_config=None):
+        self.grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
         self.residential_areas = []
         self.non_residential_areas = []
         self.all_areas = {}  # Dictionary mapping grid positions to area objects
-        self.font = futuraltheavy_font
+
+    @property
+    def font(self):
+        return get_pin_font()
     
     def add_residential_area(self, grid_position):
-        area = ResidentialArea(grid_position)
+        area = ResidentialArea(grid_position, self.grid_config)
         self.residential_areas.append(area)
         self.all_areas[grid_position] = area
         return area
 
     def add_non_residential_area(self, grid_position):
-        area = NonResidentialArea(grid_position)
+        area = NonResidentialArea(grid_position, self.grid_config)
         self.non_residential_areas.append(area)
         self.all_areas[grid_position] = area
         return area
@@ -106,7 +114,7 @@ class AreaManager:
     def generate_random_areas(self, num_residential=5, num_non_residential=5):
         self.clear_areas()
         
-        available_positions = [(x, y) for x in range(self.grid_size) for y in range(self.grid_size)]
+        available_positions = self.grid_config.points()
         random.shuffle(available_positions)
         
         for i in range(min(num_residential, len(available_positions))):
@@ -129,17 +137,18 @@ class AreaManager:
         self.non_residential_areas = []
         self.all_areas = {}
 
-    def get_random_origin_destination_pair(self):
-        if random.random() < 0.5:
+    def get_random_origin_destination_pair(self, rng=None):
+        rng = random if rng is None else rng
+        if rng.random() < 0.5:
             if not self.residential_areas or not self.non_residential_areas:
                 return None, None
-            origin = random.choice(self.residential_areas).grid_position
-            destination = random.choice(self.non_residential_areas).grid_position
+            origin = rng.choice(self.residential_areas).grid_position
+            destination = rng.choice(self.non_residential_areas).grid_position
         else:
             if not self.residential_areas or not self.non_residential_areas:
                 return None, None
-            origin = random.choice(self.non_residential_areas).grid_position
-            destination = random.choice(self.residential_areas).grid_position
+            origin = rng.choice(self.non_residential_areas).grid_position
+            destination = rng.choice(self.residential_areas).grid_position
         
         return origin, destination
 
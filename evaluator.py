@@ -0,0 +1,86 @@
+import os
+import grid
+from concurrent.futures import ProcessPoolExecutor
+from jeepset import JeepSet
+from simulation import Simulation, HEADLESS_DT
+
+# One Simulation per worker process, reused across individuals
+_worker_simulation = None
+
+def get_engine(name):
+    """
+    Simulation class for an engine name: 'step' steps Passenger objects
+    and 'event' jumps between scheduled events.
+    """
+    if name == 'event':
+        from eventsim import EventSimulation
+        return EventSimulation
+    if name != 'step':
+        raise ValueError(f"Unknown simulation engine: {name}")
+    return Simulation
+
+def evaluate_genome(genome, target_completed, seed=None, dt=HEADLESS_DT, max_time=None, grid_config=None,
+                    engine='step'):
+    """
+    Worker entry point: rebuild a JeepSet from its genome, run it headlessly
+    and return (fitness, avg_commute, completed).
+    """
+    global _worker_simulation
+    engine_class = get_engine(engine)
+    grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+    if (_worker_simulation is None or type(_worker_simulation) is not engine_class
+            or _worker_simulation.grid_config != grid_config):
+        _worker_simulation = engine_class(seed=seed, grid_config=grid_config)
+    _worker_simulation.seed = seed
+    _worker_simulation.load(JeepSet.from_genome(genome, _worker_simulation.grid_config))
+    return _worker_simulation.run(target_completed, dt, max_time)
+
+class ParallelEvaluator:
+    """
+    Evaluates a population of JeepSets on a pool of worker processes.
+    Only each individual's genome (its route corners and points) is sent to
+    the workers; the travel graph and simulation are rebuilt on their side.
+    """
+
+    def __init__(self, target_completed, seed=None, dt=HEADLESS_DT, max_time=None, workers=None,
+                 grid_config=None, engine='step'):
+        self.target_completed = target_completed
+        self.grid_config = grid_config
+        self.engine = engine
+        self.seed = seed
+        self.dt = dt
+        self.max_time = max_time
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def evaluate(self, population):
+        """Return one (fitness, avg_commute, completed) tuple per individual, in order."""
+        genomes = [individual.genome() for individual in population]
+        if not genomes:
+            return []
+        if self.workers == 1:
+            return [evaluate_genome(genome, self.target_completed, self.seed, self.dt, self.max_time,
+                                    self.grid_config, self.engine)
+                    for genome in genomes]
+
+        executor = self._get_executor()
+        futures = [executor.submit(evaluate_genome, genome, self.target_completed,
+                                   self.seed, self.dt, self.max_time, self.grid_config, self.engine)
+                   for genome in genomes]
+        return [future.result() for future in futures]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
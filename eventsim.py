@@ -0,0 +1,213 @@
+import heapq
+import math
+from jeeproute import SPEED_RECOVERY_RATE, loaded_speed
+from simulation import Simulation, HEADLESS_DT
+
+# Event kinds, in the order they run when they share a time
+JEEP_ARRIVAL = 0
+PASSENGER_AT_STOP = 1
+PASSENGER_ARRIVED = 2
+SPAWN = 3
+
+def travel_time(distance, speed, target_speed):
+    """
+    Time to cover distance when speed relaxes towards target_speed at
+    SPEED_RECOVERY_RATE, the way JeepRoute smooths it every frame:
+    v(t) = target + (v0 - target) * exp(-rate * t).
+    """
+    if distance <= 0:
+        return 0.0
+    rate = SPEED_RECOVERY_RATE
+    gap = speed - target_speed
+    t = distance / max(speed, target_speed)
+    # Distance grows monotonically with t, so Newton's method converges fast
+    for _ in range(20):
+        decay = math.exp(-rate * t)
+        covered = target_speed * t + gap * (1 - decay) / rate
+        step = (covered - distance) / (target_speed + gap * decay)
+        t -= step
+        if abs(step) < 1e-9:
+            break
+    return t
+
+def relaxed_speed(speed, target_speed, elapsed):
+    return target_speed + (speed - target_speed) * math.exp(-SPEED_RECOVERY_RATE * elapsed)
+
+class EventSimulation(Simulation):
+    """
+    Discrete-event engine: instead of ticking every frame it jumps from one
+    scheduled event to the next on a heap of (time, kind, order, data).
+
+    Jeeps raise an event each time they reach a route point. Alighting and
+    boarding happen there, from the jeep's manifest and the route's FIFO
+    boarding queue for that point. Passengers walk whole walking legs at their speed
+    and raise one event when they reach a stop or their destination. Jeep
+    speed follows the same load-dependent relaxation as JeepRoute, solved
+    in closed form between events. The metrics are the ones
+    GAManager.log_fitness reads, so fitness() and avg_commute() work as is.
+    """
+
+    def load(self, jeep_set):
+        super().load(jeep_set)
+        self.events = []
+        self.event_order = 0
+        self.now = 0.0
+        self.active_count = 0
+        self.waiting_count = 0
+        # (route index, jeep id) -> (speed, time it was measured)
+        self.jeep_speeds = {}
+        self.cell_size = self.grid_config.cell_size
+
+        for route_idx, route in enumerate(self.routes):
+            for jeep_id in range(len(route.current_route_index)):
+                self.jeep_speeds[(route_idx, jeep_id)] = (float(route.current_speed[jeep_id]), 0.0)
+                self._schedule_jeep(route_idx, jeep_id, 0.0)
+        if self.spawn_rate > 0:
+            self._push(60 / self.spawn_rate, SPAWN, None)
+
+    def _push(self, time, kind, data):
+        heapq.heappush(self.events, (time, kind, self.event_order, data))
+        self.event_order += 1
+
+    def passenger_count(self):
+        return self.active_count
+
+    def _schedule_jeep(self, route_idx, jeep_id, now):
+        """Schedule the jeep's arrival at the point after its current one."""
+        route = self.routes[route_idx]
+        points = route.route_points
+        index = route.current_route_index[jeep_id]
+        next_index = (index + 1) % len(points)
+        (x1, y1), (x2, y2) = points[index], points[next_index]
+        # Jeeps move along one axis at a time, so the path is Manhattan
+        distance = (abs(x2 - x1) + abs(y2 - y1)) * self.cell_size
+        speed, _ = self.jeep_speeds[(route_idx, jeep_id)]
+        target = loaded_speed(int(route.passengerAmt[jeep_id]), route.MAX_CAPACITY)
+        self._push(now + travel_time(distance, speed, target), JEEP_ARRIVAL, (route_idx, jeep_id, next_index))
+
+    def _start_walking(self, p, now):
+        # Walk the leg up to the next stop, or to the end of the plan
+        plan, step = p.plan, p.current_step
+        end = plan.leg_ends[step]
+        reached_end = plan.routes[end] < 0
+        cells = plan.cells[end if reached_end else end - 1] - plan.cells[step]
+        step = end
+        p.state = "walking"
+        arrive = now + cells * self.cell_size / p.speed
+        self._push(arrive, PASSENGER_ARRIVED if reached_end else PASSENGER_AT_STOP, (p, step))
+
+    def _spawn(self, now):
+        if self.active_count < self.max_passengers:
+            orig, dest = self.area_manager.get_random_origin_destination_pair(self.rng)
+            if orig and dest:
+                p = self.free_passengers.take(rng=self.rng)
+                p.set_trip_between_areas(orig, dest)
+                if not p.plan_route(self.travel_graph):
+                    self.free_passengers.give_back((p,))
+                else:
+                    p.spawn_time = now
+                    self.active_count += 1
+                    self.state.metrics['total_spawned'] += 1
+                    self._start_walking(p, now)
+        self._push(now + 60 / self.spawn_rate, SPAWN, None)
+
+    def _passenger_at_stop(self, p, step, now):
+        p.current_step = step
+        p.state = "waiting_jeep"
+        p.wait_start = now
+        self.routes[p.plan.routes[step]].enqueue_passenger(p, p.plan.point(step))
+        self.waiting_count += 1
+        metrics = self.state.metrics
+        metrics['max_waiting'] = max(metrics['max_waiting'], self.waiting_count)
+
+    def _passenger_arrived(self, p, now):
+        p.state = "arrived"
+        p.current_step = len(p.plan) - 1
+        p.real_time = now - p.spawn_time
+        p.journey_time += p.real_time
+        metrics = self.state.metrics
+        metrics['total_commute'] += p.real_time
+        metrics['total_fitness'] += 100 * math.exp(-p.journey_time / 60)
+        metrics['completed'] += 1
+        self.active_count -= 1
+        self.free_passengers.give_back((p,))
+
+    def _jeep_arrival(self, route_idx, jeep_id, index, now):
+        route = self.routes[route_idx]
+        key = (route_idx, jeep_id)
+        speed, since = self.jeep_speeds[key]
+        target = loaded_speed(int(route.passengerAmt[jeep_id]), route.MAX_CAPACITY)
+        self.jeep_speeds[key] = (relaxed_speed(speed, target, now - since), now)
+
+        route.current_route_index[jeep_id] = index
+        point = route.route_points[index]
+        route.jeepLocation[jeep_id] = route.grid_config.to_screen(*point)
+
+        # Passengers due at this point get off first
+        for p in route.manifests[jeep_id].pop(index, ()):
+            p.alight()
+            self._start_walking(p, now)
+
+        queue = route.boarding_queues.get(point)
+        while queue and route.passengerAmt[jeep_id] < route.MAX_CAPACITY:
+            p = queue.popleft()
+            self.waiting_count -= 1
+            p.journey_time -= now - p.wait_start
+            p.board(route, jeep_id)
+
+        self._schedule_jeep(route_idx, jeep_id, now)
+
+    def _advance(self, now):
+        """Account the waiting time up to now and move the clock."""
+        self.state.metrics['total_wait'] += self.waiting_count * (now - self.now)
+        self.now = now
+
+    def process_until(self, end_time, target_completed=None):
+        """Run every event up to end_time, or until target_completed passengers arrived."""
+        events = self.events
+        metrics = self.state.metrics
+        while events and events[0][0] <= end_time:
+            if target_completed is not None and metrics['completed'] >= target_completed:
+                return
+            now, kind, _, data = heapq.heappop(events)
+            self._advance(now)
+            if kind == JEEP_ARRIVAL:
+                self._jeep_arrival(*data, now)
+            elif kind == PASSENGER_AT_STOP:
+                self._passenger_at_stop(*data, now)
+            elif kind == PASSENGER_ARRIVED:
+                self._passenger_arrived(data[0], now)
+            else:
+                self._spawn(now)
+        if end_time != float('inf'):
+            self._advance(end_time)
+
+    def update_waiting_passengers(self):
+        waiting = {}
+        for route_idx, route in enumerate(self.routes):
+            for point, queue in route.boarding_queues.items():
+                if queue:
+                    waiting.setdefault(point, {})[route_idx] = len(queue)
+        self.state.waiting_passengers = waiting
+
+    def substeps(self, dt):
+        # Events land at their exact times, so a step never needs splitting
+        return 1
+
+    def step(self, dt):
+        """Advance the clock by dt simulated seconds."""
+        self.process_until(self.now + dt)
+        self.state.simulation_time = self.now
+
+    def run(self, target_completed, dt=HEADLESS_DT, max_time=None):
+        """
+        Jump from event to event until target_completed passengers have
+        arrived or max_time simulated seconds have passed; dt is unused.
+        """
+        if max_time is None and self.spawn_rate <= 0 and self.active_count == 0:
+            max_time = self.now  # Nobody will ever arrive
+        end_time = float('inf') if max_time is None else max_time
+        self.process_until(end_time, target_completed)
+        self.state.simulation_time = self.now
+        self.update_waiting_passengers()
+        return self.fitness(), self.avg_commute(), self.state.metrics['completed']
@@ -0,0 +1,146 @@
+import csv
+import random
+import time
+from datetime import datetime
+from jeepset import JeepSet
+from evaluator import ParallelEvaluator
+
+# GA Config
+GA_CONFIG = {
+    'population_size': 10,
+    'generations': 10,
+    'elitism': 2,
+    'mutation_rate': 0.3,
+    'target_completed': 5000,
+    'seed': None,       # Seed each evaluation for reproducible fitness
+    'fixed_dt': False,  # Step FIXED_DT * speed per frame instead of wall-clock time
+    'workers': None,    # Worker processes for headless runs (None = all cores)
+    'engine': 'step',   # Headless engine: 'step' (Passenger objects) or 'event'
+    'fleet_size': 2,    # Jeeps per route in the initial population
+}
+
+class GAManager:
+    def __init__(self):
+        self.population = [JeepSet(fleet_size=GA_CONFIG['fleet_size']) for _ in range(GA_CONFIG['population_size'])]
+        self.current_gen = 0
+        self.current_indiv = 0
+        self.best_fitness = float('-inf')
+        self.current_fitness = 0
+        self.best_gen = 0
+        self.best_indiv = 0
+        # genome_key -> (fitness, avg_commute, completed) for every individual ever evaluated
+        self.fitness_cache = {}
+        self.filename = f"ga_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        self.init_log_file()
+
+    def init_log_file(self):
+        with open(self.filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'generation', 'individual', 'fitness', 'avg_commute', 'completed'])
+
+    def log_fitness(self, simulation):
+        """Record the result of the individual that simulation just ran."""
+        completed = simulation.state.metrics['completed']
+        if completed == 0:
+            self.current_fitness = 0
+            self.fitness_cache[self.population[self.current_indiv].genome_key()] = (0, 0.0, 0)
+            return
+
+        self.record_fitness(simulation.fitness(), simulation.avg_commute(), completed)
+
+    def record_fitness(self, fitness, avg_commute, completed):
+        self.current_fitness = fitness
+        self.fitness_cache[self.population[self.current_indiv].genome_key()] = (fitness, avg_commute, completed)
+
+        if self.current_fitness > self.best_fitness:
+            self.best_fitness = self.current_fitness
+            self.best_gen = self.current_gen
+            self.best_indiv = self.current_indiv
+
+        with open(self.filename, 'a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([
+                datetime.now().isoformat(),
+                self.current_gen,
+                self.current_indiv,
+                self.current_fitness,
+                avg_commute,
+                completed
+            ])
+
+    def next_unevaluated(self, start=0):
+        """
+        Index of the next individual from start whose genome has no cached
+        fitness, or None. Cached individuals were logged when first evaluated.
+        """
+        for idx in range(start, len(self.population)):
+            self.current_indiv = idx
+            if self.population[idx].genome_key() not in self.fitness_cache:
+                return idx
+        return None
+
+    def evaluate_generation(self, evaluator):
+        """Evaluate every genome not seen before at once and log the new results."""
+        pending = {}
+        for individual in self.population:
+            key = individual.genome_key()
+            if key not in self.fitness_cache and key not in pending:
+                pending[key] = individual
+
+        fresh = dict(zip(pending, evaluator.evaluate(list(pending.values()))))
+        self.fitness_cache.update(fresh)
+        for idx, individual in enumerate(self.population):
+            result = fresh.pop(individual.genome_key(), None)
+            if result is not None and result[2] > 0:
+                self.current_indiv = idx
+                self.record_fitness(*result)
+        return [self.fitness_cache[individual.genome_key()] for individual in self.population]
+
+    def advance_generation(self):
+        sorted_pop = sorted(self.population, key=lambda ind: self.get_fitness(ind), reverse=True)
+        new_pop = sorted_pop[:GA_CONFIG['elitism']]
+
+        while len(new_pop) < GA_CONFIG['population_size']:
+            parent1 = self.tournament_select()
+            parent2 = self.tournament_select()
+            child1, child2 = JeepSet.crossover(parent1, parent2)
+
+            if random.random() < GA_CONFIG['mutation_rate']:
+                child1.mutate()
+            if random.random() < GA_CONFIG['mutation_rate']:
+                child2.mutate()
+
+            new_pop.extend([child1, child2])
+
+        self.population = new_pop[:GA_CONFIG['population_size']]
+        self.current_gen += 1
+        self.current_indiv = 0
+
+    def tournament_select(self, k=3):
+        return max(random.sample(self.population, k), key=lambda ind: self.get_fitness(ind))
+
+    def get_fitness(self, individual):
+        cached = self.fitness_cache.get(individual.genome_key())
+        return cached[0] if cached is not None else 0
+
+def run_headless():
+    """Run the whole GA without a display, evaluating each generation in parallel."""
+    ga = GAManager()
+    evaluator = ParallelEvaluator(GA_CONFIG['target_completed'],
+                                  seed=GA_CONFIG['seed'],
+                                  workers=GA_CONFIG['workers'],
+                                  engine=GA_CONFIG['engine'])
+    with evaluator:
+        while True:
+            start = time.perf_counter()
+            ga.evaluate_generation(evaluator)
+            print(f"Generation {ga.current_gen}: best {ga.best_fitness:.1f} "
+                  f"(Gen {ga.best_gen} Ind {ga.best_indiv}) "
+                  f"in {time.perf_counter() - start:.1f}s")
+            if ga.current_gen >= GA_CONFIG['generations'] - 1:
+                break
+            ga.advance_generation()
+    print("GA Complete!")
+
+if __name__ == "__main__":
+    run_headless()
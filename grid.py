@@ -13,38 +13,89 @@ GRID_ROWS = 16
 GRID_COLS = 16
 GRID_LINE_WIDTH = 1
 
+class GridConfig:
+    """
+    Size of the city grid and where it sits on the screen.
+    rows and cols count cells, so grid points run from (0, 0) to (cols, rows).
+    Every module takes one of these instead of assuming the 16x16 default.
+    """
+
+    def __init__(self, rows=GRID_ROWS, cols=GRID_COLS, cell_size=CELL_SIZE,
+                 screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT):
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = cell_size
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        # Top left corner of the grid on the screen
+        self.origin_x = (screen_width - cols * cell_size) // 2
+        self.origin_y = (screen_height - rows * cell_size) // 2 + 20
+
+    def key(self):
+        return (self.rows, self.cols, self.cell_size, self.screen_width, self.screen_height)
+
+    # Compared by value so a config unpickled in a worker matches the one it was copied from
+    def __eq__(self, other):
+        return isinstance(other, GridConfig) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    @property
+    def max_x(self):
+        return self.cols
+
+    @property
+    def max_y(self):
+        return self.rows
+
+    def contains(self, x, y):
+        return 0 <= x <= self.cols and 0 <= y <= self.rows
+
+    def clamp_x(self, x):
+        return max(0, min(self.cols, x))
+
+    def clamp_y(self, y):
+        return max(0, min(self.rows, y))
+
+    def points(self):
+        """Every grid point, column by column."""
+        return [(x, y) for x in range(self.cols + 1) for y in range(self.rows + 1)]
+
+    def to_screen(self, x, y):
+        return (
+            self.origin_x + x * self.cell_size,
+            self.origin_y + y * self.cell_size
+        )
+
+DEFAULT_GRID = GridConfig()
+
 # Function to draw the grid =========================
-def draw_grid(screen):
+def draw_grid(screen, grid_config=None):
+    grid_config = DEFAULT_GRID if grid_config is None else grid_config
     # Calculate grid position
-    grid_width = GRID_COLS * CELL_SIZE
-    grid_height = GRID_ROWS * CELL_SIZE
-    grid_x = (SCREEN_WIDTH - grid_width) // 2 
-    grid_y = (SCREEN_HEIGHT - grid_height) // 2 + 20
+    grid_width = grid_config.cols * grid_config.cell_size
+    grid_height = grid_config.rows * grid_config.cell_size
+    grid_x = grid_config.origin_x
+    grid_y = grid_config.origin_y
 
     # Fill the background
     screen.fill(BACKGROUND_COLOR)
 
     # Draw the grid
-    for row in range(GRID_ROWS + 1):
-        pygame.draw.line(screen, GRID_COLOR, 
-                         (grid_x, grid_y + row * CELL_SIZE), 
-                         (grid_x + grid_width, grid_y + row * CELL_SIZE), 
+    for row in range(grid_config.rows + 1):
+        pygame.draw.line(screen, GRID_COLOR,
+                         (grid_x, grid_y + row * grid_config.cell_size),
+                         (grid_x + grid_width, grid_y + row * grid_config.cell_size),
                          GRID_LINE_WIDTH)
-    for col in range(GRID_COLS + 1):
-        pygame.draw.line(screen, GRID_COLOR, 
-                         (grid_x + col * CELL_SIZE, grid_y), 
-                         (grid_x + col * CELL_SIZE, grid_y + grid_height), 
+    for col in range(grid_config.cols + 1):
+        pygame.draw.line(screen, GRID_COLOR,
+                         (grid_x + col * grid_config.cell_size, grid_y),
+                         (grid_x + col * grid_config.cell_size, grid_y + grid_height),
                          GRID_LINE_WIDTH)
 
-def get_grid_coors(x, y):
+def get_grid_coors(x, y, grid_config=None):
     # top left corner is (0,0),
-    # bottom right corner is (16,16)
-    grid_width = GRID_COLS * CELL_SIZE
-    grid_height = GRID_ROWS * CELL_SIZE
-    grid_x = (SCREEN_WIDTH - grid_width) // 2
-    grid_y = (SCREEN_HEIGHT - grid_height) // 2 + 20
-
-    return (
-        grid_x + x * CELL_SIZE,
-        grid_y + y * CELL_SIZE
-    )
\ No newline at end of file
+    # bottom right corner is (cols, rows), (16,16) by default
+    grid_config = DEFAULT_GRID if grid_config is None else grid_config
+    return grid_config.to_screen(x, y)
@@ -1,18 +1,84 @@
+import random
+from collections import deque
 from random import randint
+import numpy as np
 import pygame
 import grid
-import math
 
 # Constants moved to top level for better visibility and maintenance
 JEEP_SPEED = 150
 SLOWDOWN_FACTOR = 0.3
 SPEED_RECOVERY_RATE = 0.8
 MAX_CAPACITY = 16
+JEEPS_PER_ROUTE = 2
+
+def loaded_speed(passenger_count, capacity=MAX_CAPACITY):
+    """Speed a jeep settles at when carrying passenger_count passengers"""
+    # Apply slowdown based on passenger count
+    if passenger_count > 0:
+        slowdown = 1.0 - min(passenger_count / capacity, 0.7) * SLOWDOWN_FACTOR
+        return JEEP_SPEED * slowdown
+    return JEEP_SPEED
+
+def loaded_speeds(passenger_counts, capacity=MAX_CAPACITY):
+    """loaded_speed for an array of passenger counts"""
+    slowdown = 1.0 - np.minimum(passenger_counts / capacity, 0.7) * SLOWDOWN_FACTOR
+    return np.where(passenger_counts > 0, JEEP_SPEED * slowdown, float(JEEP_SPEED))
+
+def ease_speeds(speeds, passenger_counts, capacity, dt):
+    """
+    Relax speeds, in place, towards the speed each jeep's load allows,
+    v(t) = target + (v0 - target) * exp(-rate * t), and return how far each
+    jeep got meanwhile. Both are exact for any dt while the load holds.
+    """
+    target = loaded_speeds(passenger_counts, capacity)
+    decay = np.exp(-SPEED_RECOVERY_RATE * dt)
+    distances = target * dt + (speeds - target) * (1 - decay) / SPEED_RECOVERY_RATE
+    speeds[:] = target + (speeds - target) * decay
+    return distances
+
+def drive_jeeps(positions, destinations, budgets, moving_along_x, in_reverse):
+    """Move jeeps, in place, towards their destinations and return the mask of those that reached them"""
+    delta = destinations - positions
+    distance = np.abs(delta[:, 0]) + np.abs(delta[:, 1])
+    arrived = budgets >= distance
+
+    along_x = np.abs(delta[:, 0]) > np.abs(delta[:, 1])
+    offset = np.where(along_x, delta[:, 0], delta[:, 1])
+    step = np.where(budgets > 0, np.copysign(np.minimum(budgets, np.abs(offset)), offset), 0.0)
+    positions[:, 0] += np.where(along_x, step, 0.0)
+    positions[:, 1] += np.where(along_x, 0.0, step)
+    positions[arrived] = destinations[arrived]
+
+    turned = (budgets > 0) & (distance > 0)
+    moving_along_x[:] = np.where(turned, along_x, moving_along_x)
+    in_reverse[:] = np.where(turned, offset < 0, in_reverse)
+    # Arrived jeeps keep what is left to drive; the rest are done for this step
+    budgets[:] = np.where(arrived, budgets - distance, -1.0)
+    return arrived
+
+def sweep_jeeps(positions, budgets, destination_of, serve, moving_along_x, in_reverse):
+    """Drive jeeps, in place, through budgets pixels, calling serve(jeep) at every point reached"""
+    while True:
+        arrived = drive_jeeps(positions, destination_of(), budgets, moving_along_x, in_reverse)
+        if not arrived.any():
+            return
+        for jeep in np.flatnonzero(arrived):
+            serve(int(jeep))
 
 class JeepRoute:
-    def __init__(self, color=(255, 0, 0), route=None, route_points=None):
+    """
+    A loop of route points driven by fleet_size jeeps.
+    Per-jeep state (positions, speeds, loads, route indices and headings)
+    is kept in NumPy arrays indexed by jeep id, so update() moves the
+    whole fleet in a few array operations.
+    """
+
+    def __init__(self, color=(255, 0, 0), route=None, route_points=None, grid_config=None,
+                 fleet_size=JEEPS_PER_ROUTE):
         # JEEPNEY ROUTE INITIALIZATION
         self.color = color
+        self.grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
         self.route = [] if route is None else route
         self.route_points = [] if route_points is None else route_points
         
@@ -21,47 +87,61 @@ class JeepRoute:
             
         if len(self.route_points) < 2:
             raise ValueError("Route must have at least 2 points")
+        if fleet_size < 1:
+            raise ValueError("A route needs at least one jeep")
             
         # JEEPNEYS INITIALIZATION
-        self._initialize_jeeps()
+        self.speed = JEEP_SPEED
+        self.MAX_CAPACITY = MAX_CAPACITY
+        self.fleet_size = fleet_size
+        self.reset_jeeps()
+
+    def reset_jeeps(self, rng=None):
+        """Place the jeeps back on the route, empty and at full speed"""
+        # Screen position of every route point, converted once per layout
+        self.screen_points = np.array([self.grid_config.to_screen(*point) for point in self.route_points],
+                                      dtype=float)
+        self._initialize_jeeps(rng)
         
         # Speed properties
-        self.speed = JEEP_SPEED
-        self.current_speed = [JEEP_SPEED, JEEP_SPEED]
-        self.last_passenger_count = [0, 0]
+        self.current_speed = np.full(self.fleet_size, float(JEEP_SPEED))
         
         # PASSENGER INITIALIZATION
-        self.MAX_CAPACITY = MAX_CAPACITY
-        self.passengerAmt = [0, 0]
+        self.passengerAmt = np.zeros(self.fleet_size, dtype=int)
+        # grid point -> passengers waiting there for this route, first come first served
+        self.boarding_queues = {}
+        # Per jeep: route_points index -> passengers alighting there
+        self.manifests = [{} for _ in range(self.fleet_size)]
+        # grid point -> every index it has in route_points
+        self.point_indices = {}
+        for index, point in enumerate(self.route_points):
+            self.point_indices.setdefault(point, []).append(index)
+
+    def clear_passengers(self):
+        """Forget every waiting and riding passenger, leaving the jeeps where they are."""
+        self.boarding_queues = {}
+        self.manifests = [{} for _ in range(self.fleet_size)]
+        self.passengerAmt[:] = 0
 
-    def _initialize_jeeps(self):
+    def _initialize_jeeps(self, rng=None):
         """Initialize jeep properties and positions"""
-        self.isMovingAlongX = [False, False]
-        self.isInReverse = [False, False]
+        rng = random if rng is None else rng
+        self.isMovingAlongX = np.zeros(self.fleet_size, dtype=bool)
+        self.isInReverse = np.zeros(self.fleet_size, dtype=bool)
         
-        # Initialize position tracking variables
-        self.jeepLocation = [None, None]
-        self.exact_position = [None, None]
-        self.jeepDestination = [None, None]
-        self.current_route_index = [None, None]
-        
-        # Place first jeep at random location on route
-        startIndex = randint(0, len(self.route_points) - 1)
-        self.current_route_index[0] = startIndex
-        self.jeepLocation[0] = grid.get_grid_coors(*self.route_points[startIndex])
-        self.exact_position[0] = [float(self.jeepLocation[0][0]), float(self.jeepLocation[0][1])]
-
-        # Place second jeep at halfway point on route
+        # Place the first jeep at a random location on the route and
+        # space the rest evenly behind it
         route_length = len(self.route_points)
-        half_way_index = (startIndex + route_length // 2) % route_length
-        self.current_route_index[1] = half_way_index
-        self.jeepLocation[1] = grid.get_grid_coors(*self.route_points[half_way_index])
-        self.exact_position[1] = [float(self.jeepLocation[1][0]), float(self.jeepLocation[1][1])]
+        startIndex = rng.randint(0, route_length - 1)
+        offsets = np.arange(self.fleet_size) * route_length // self.fleet_size
+        self.current_route_index = (startIndex + offsets) % route_length
+        self.exact_position = self.screen_points[self.current_route_index]
+        self.jeepLocation = self.exact_position.astype(int)
 
-        # Set initial destinations for both jeeps
-        for i in range(2):
-            next_index = (self.current_route_index[i] + 1) % len(self.route_points)
-            self.jeepDestination[i] = grid.get_grid_coors(*self.route_points[next_index])
+    @property
+    def jeepDestination(self):
+        """Screen position of the point each jeep is heading to"""
+        return self.screen_points[(self.current_route_index + 1) % len(self.route_points)]
             
     def randomizeRoute(self): 
         """Generate a random route for jeepneys to follow"""
@@ -70,7 +150,7 @@ class JeepRoute:
         turns = randint(1, 3)
         
         # Start with a random point
-        start_point = (randint(0, 16), randint(0, 16))
+        start_point = (randint(0, self.grid_config.max_x), randint(0, self.grid_config.max_y))
         self.route.append(start_point)
         self.route_points.append(start_point)
         
@@ -98,14 +178,14 @@ class JeepRoute:
         if is_x_direction:
             # Find a new x coordinate
             while attempts < max_attempts:
-                new_x = randint(0, 16)
+                new_x = randint(0, self.grid_config.max_x)
                 if new_x != prev_x:
                     path_clear = True
                     step = 1 if new_x > prev_x else -1
                     
                     # Check if path is clear
                     for x in range(prev_x + step, new_x + step, step):
-                        if (x, prev_y) in self.route_points:
+                        if (x, prev_y) in all_points:
                             path_clear = False
                             break
                     
@@ -123,14 +203,14 @@ class JeepRoute:
         else:
             # Find a new y coordinate
             while attempts < max_attempts:
-                new_y = randint(0, 16)
+                new_y = randint(0, self.grid_config.max_y)
                 if new_y != prev_y:
                     path_clear = True
                     step = 1 if new_y > prev_y else -1
                     
                     # Check if path is clear
                     for y in range(prev_y + step, new_y + step, step):
-                        if (prev_x, y) in self.route_points:
+                        if (prev_x, y) in all_points:
                             path_clear = False
                             break
                     
@@ -197,12 +277,12 @@ class JeepRoute:
     
     def drawRoute(self, screen):
         """Draw the route on the screen"""
-        screen_points = [grid.get_grid_coors(x, y) for x, y in self.route]
+        screen_points = [self.grid_config.to_screen(x, y) for x, y in self.route]
         pygame.draw.polygon(screen, self.color, screen_points, 5)
         
     def drawJeep(self, screen):
-        """Draw both jeeps on the screen with passengers"""
-        for jeep_id in range(2):
+        """Draw every jeep of the route on the screen with passengers"""
+        for jeep_id in range(self.fleet_size):
             jeep_x, jeep_y = self.jeepLocation[jeep_id][0], self.jeepLocation[jeep_id][1]
             
             # Scale jeep to 2/3 size: original (68, 20) -> (45, 13)
@@ -256,75 +336,47 @@ class JeepRoute:
         """Add or remove passengers from a jeep"""
         self.passengerAmt[jeep_id] += amt
 
+    def enqueue_passenger(self, passenger, point):
+        """Queue a passenger at a stop until one of this route's jeeps reaches it"""
+        queue = self.boarding_queues.get(point)
+        if queue is None:
+            queue = self.boarding_queues[point] = deque()
+        queue.append(passenger)
+
+    def add_rider(self, passenger, jeep_id, point):
+        """Book a passenger on jeep jeep_id to get off the next time it reaches point"""
+        here = self.current_route_index[jeep_id]
+        # Nearest occurrence of point ahead of the jeep; a route may pass a point twice
+        index = min(self.point_indices[point], key=lambda index: (index - here - 1) % len(self.route_points))
+        self.manifests[jeep_id].setdefault(index, []).append(passenger)
+
+    def _alight_riders(self, jeep_id):
+        """Let off every passenger booked to alight at the jeep's current point"""
+        for passenger in self.manifests[jeep_id].pop(self.current_route_index[jeep_id], ()):
+            passenger.alight()
+
+    def _board_waiting(self, jeep_id):
+        """Board passengers queued at the jeep's current point, in arrival order, while seats last"""
+        queue = self.boarding_queues.get(self.route_points[self.current_route_index[jeep_id]])
+        while queue and self.passengerAmt[jeep_id] < self.MAX_CAPACITY:
+            queue.popleft().board(self, jeep_id)
+
     def update(self, dt):
         """Update jeep positions and handle speed adjustments"""
-        for jeep_id in range(2):
-            # Check for passenger changes and adjust speed
-            self._update_jeep_speed(jeep_id, dt)
-            
-            # Update jeep position
-            self._update_jeep_position(jeep_id, dt)
-    
-    def _update_jeep_speed(self, jeep_id, dt):
-        """Update jeep speed based on passenger count"""
-        current_passenger_count = self.passengerAmt[jeep_id]
-        
-        # Apply slowdown based on passenger count
-        if current_passenger_count > 0:
-            slowdown = 1.0 - min(current_passenger_count / self.MAX_CAPACITY, 0.7) * SLOWDOWN_FACTOR
-            target_speed = JEEP_SPEED * slowdown
-        else:
-            target_speed = JEEP_SPEED
-            
-        # Smooth speed transitions
-        speed_diff = target_speed - self.current_speed[jeep_id]
-        self.current_speed[jeep_id] += speed_diff * SPEED_RECOVERY_RATE * dt
-        
-        # Store passenger count for next update
-        self.last_passenger_count[jeep_id] = current_passenger_count
-            
-    def _update_jeep_position(self, jeep_id, dt):
-        """Update jeep position based on current destination"""
-        dx = self.jeepDestination[jeep_id][0] - self.exact_position[jeep_id][0]
-        dy = self.jeepDestination[jeep_id][1] - self.exact_position[jeep_id][1]
-        distance = math.sqrt(dx * dx + dy * dy)
+        distances = ease_speeds(self.current_speed, self.passengerAmt, self.MAX_CAPACITY, dt)
+
+        sweep_jeeps(self.exact_position, distances, lambda: self.jeepDestination,
+                    self._set_new_destination, self.isMovingAlongX, self.isInReverse)
 
-        # Check if jeep reached destination
-        if distance < 2:
-            self._set_new_destination(jeep_id)
-        else:
-            self._move_jeep(jeep_id, dx, dy, dt)
-            
         # Update grid-aligned location
-        self.jeepLocation[jeep_id] = (int(self.exact_position[jeep_id][0]),
-                                    int(self.exact_position[jeep_id][1]))
+        self.jeepLocation[:] = self.exact_position
         
     def _set_new_destination(self, jeep_id):
-        """Set jeep to current destination and determine next destination"""
-        # Snap to exact destination position
-        self.exact_position[jeep_id][0] = self.jeepDestination[jeep_id][0]
-        self.exact_position[jeep_id][1] = self.jeepDestination[jeep_id][1]
-        self.jeepLocation[jeep_id] = (int(self.exact_position[jeep_id][0]),
-                                    int(self.exact_position[jeep_id][1]))
+        """Snap the jeep onto the point it reached and serve the passengers there"""
+        self.exact_position[jeep_id] = self.jeepDestination[jeep_id]
 
-        # Move to next point in route
+        # The jeep is now at the next point in route; the next destination
+        # follows from the index
         self.current_route_index[jeep_id] = (self.current_route_index[jeep_id] + 1) % len(self.route_points)
-        
-        # Get coordinates for the next destination
-        next_point = self.route_points[self.current_route_index[jeep_id]]
-        self.jeepDestination[jeep_id] = grid.get_grid_coors(*next_point)
-    
-    def _move_jeep(self, jeep_id, dx, dy, dt):
-        """Move jeep toward destination"""
-        if abs(dx) > abs(dy):
-            # Move horizontally
-            move_distance = min(self.current_speed[jeep_id] * dt, abs(dx))
-            self.exact_position[jeep_id][0] += math.copysign(move_distance, dx)
-            self.isMovingAlongX[jeep_id] = True
-            self.isInReverse[jeep_id] = dx < 0
-        else:
-            # Move vertically
-            move_distance = min(self.current_speed[jeep_id] * dt, abs(dy))
-            self.exact_position[jeep_id][1] += math.copysign(move_distance, dy)
-            self.isMovingAlongX[jeep_id] = False
-            self.isInReverse[jeep_id] = dy < 0
\ No newline at end of file
+        self._alight_riders(jeep_id)
+        self._board_waiting(jeep_id)
@@ -1,5 +1,7 @@
 import random
+import numpy as np
 import pygame
+import grid
 
 class JeepSet:
     COLOR_ORDER = [
@@ -11,14 +13,42 @@ class JeepSet:
         ('GRAY',       (163, 163, 163)),
     ]
 
-    def __init__(self):
-        from jeeproute import JeepRoute
+    def __init__(self, genome=None, grid_config=None, fleet_size=None):
+        from jeeproute import JeepRoute, JEEPS_PER_ROUTE
+        self.grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+        fleet_size = JEEPS_PER_ROUTE if fleet_size is None else fleet_size
         self.routes = []
         for idx, (name, color) in enumerate(self.COLOR_ORDER):
-            route = JeepRoute(color=color)
+            if genome is None:
+                route = JeepRoute(color=color, grid_config=self.grid_config, fleet_size=fleet_size)
+            else:
+                corners, route_points, route_fleet = genome[idx]
+                route = JeepRoute(color=color, route=list(corners), route_points=list(route_points),
+                                  grid_config=self.grid_config, fleet_size=route_fleet)
             route.jeep_id = idx
             self.routes.append(route)
 
+        # Travel graph built for these routes. A set derived from another one
+        # keeps that set's graph as base_graph plus the indices of the routes
+        # that differ, so its own graph can be patched instead of rebuilt.
+        self.travel_graph = None
+        self.base_graph = None
+        self.changed_routes = set()
+        self._bind_fleets()
+
+    @classmethod
+    def from_genome(cls, genome, grid_config=None):
+        """Rebuild a JeepSet from the output of genome()."""
+        return cls(genome=genome, grid_config=grid_config)
+
+    def genome(self):
+        """Route corners, route points and fleet size of every route; small and picklable."""
+        return [(tuple(route.route), tuple(route.route_points), route.fleet_size) for route in self.routes]
+
+    def genome_key(self):
+        """Hashable key of the genome, unnormalized since seeded jeep placement depends on point order."""
+        return tuple(self.genome())
+
     def __iter__(self):
         return iter(self.routes)
 
@@ -28,6 +58,73 @@ class JeepSet:
     def __len__(self):
         return len(self.routes)
 
+    # Per-jeep state every route keeps as a view into the set's arrays
+    FLEET_ARRAYS = ('exact_position', 'jeepLocation', 'current_speed', 'passengerAmt',
+                    'current_route_index', 'isMovingAlongX', 'isInReverse')
+
+    def reset_jeeps(self, rng=None):
+        """Put every route's jeeps back on the route, empty and at full speed."""
+        for route in self.routes:
+            route.reset_jeeps(rng)
+        self._bind_fleets()
+
+    def clear_passengers(self):
+        """Drop every route's waiting and riding passengers."""
+        for route in self.routes:
+            route.clear_passengers()
+
+    def _bind_fleets(self):
+        """
+        Concatenate the jeeps of every route into set-wide arrays and make
+        each route's arrays slices of them, so step() and the routes' own
+        methods read and write the same numbers. Route points are stacked
+        into one array of screen positions, addressed per jeep by the
+        offset and length of its route.
+        """
+        routes = self.routes
+        for name in self.FLEET_ARRAYS:
+            setattr(self, name, np.concatenate([getattr(route, name) for route in routes]))
+        start = 0
+        for route in routes:
+            for name in self.FLEET_ARRAYS:
+                setattr(route, name, getattr(self, name)[start:start + route.fleet_size])
+            start += route.fleet_size
+
+        fleet_sizes = [route.fleet_size for route in routes]
+        lengths = [len(route.screen_points) for route in routes]
+        self.screen_points = np.concatenate([route.screen_points for route in routes])
+        self.jeep_route = np.repeat(np.arange(len(routes)), fleet_sizes)
+        self.jeep_slot = np.concatenate([np.arange(size) for size in fleet_sizes])
+        self.point_offset = np.repeat(np.cumsum([0] + lengths[:-1]), fleet_sizes)
+        self.route_length = np.repeat(lengths, fleet_sizes)
+        self.capacity = np.repeat([route.MAX_CAPACITY for route in routes], fleet_sizes)
+
+    def step(self, dt):
+        """Advance every jeep of every route by dt in one pass over the set's arrays."""
+        from jeeproute import ease_speeds, sweep_jeeps
+        if any(route.current_speed.base is not self.current_speed for route in self.routes):
+            self._bind_fleets()  # A route was reset on its own
+
+        distances = ease_speeds(self.current_speed, self.passengerAmt, self.capacity, dt)
+
+        def destination_of():
+            return self.screen_points[self.point_offset + (self.current_route_index + 1) % self.route_length]
+
+        def serve(jeep):
+            self.routes[self.jeep_route[jeep]]._set_new_destination(int(self.jeep_slot[jeep]))
+
+        sweep_jeeps(self.exact_position, distances, destination_of, serve,
+                    self.isMovingAlongX, self.isInReverse)
+        self.jeepLocation[:] = self.exact_position
+
+    def mark_route_changed(self, jeep_idx):
+        """Record that a route no longer matches the graph this set was built or derived from."""
+        if self.travel_graph is not None:
+            self.base_graph = self.travel_graph
+            self.travel_graph = None
+            self.changed_routes = set()
+        self.changed_routes.add(jeep_idx)
+
     def add_to_graph(self, travel_graph):
         """Registers all Jeeps in this set into the given TravelGraph."""
         for idx, route in enumerate(self.routes):
@@ -35,14 +132,17 @@ class JeepSet:
     
     def crossover(parent1, parent2):
         def create_child(first_parent, second_parent):
-            child = JeepSet()
-            
-            for i in range(len(child)):
-                source = first_parent if i < 3 else second_parent
-                child[i].route = [point for point in source[i].route]
-                child[i].route_points = [point for point in source[i].route_points]
-                child[i].jeep_id = source[i].jeep_id
-                
+            # Build straight from the mixed genome rather than generating
+            # random routes first and overwriting them
+            sources = [(first_parent if i < 3 else second_parent)[i] for i in range(len(first_parent))]
+            child = JeepSet(genome=[(route.route, route.route_points, route.fleet_size) for route in sources],
+                            grid_config=first_parent.grid_config)
+            for route, source in zip(child, sources):
+                route.jeep_id = source.jeep_id
+
+            # Routes 0-2 match the first parent, so patch its graph if it has one
+            child.base_graph = first_parent.travel_graph
+            child.changed_routes = set(range(3, len(child)))
             return child
 
         return (
@@ -94,13 +194,13 @@ class JeepSet:
         
         # Apply shift while maintaining rectangular shape
         if is_horizontal:
-            new_y = max(0, min(16, y1 + shift))
+            new_y = self.grid_config.clamp_y(y1 + shift)
             # Update all points with the same y-coordinate
             for i, (x, y) in enumerate(corners):
                 if y == y1:
                     new_corners[i] = (x, new_y)
         else:
-            new_x = max(0, min(16, x1 + shift))
+            new_x = self.grid_config.clamp_x(x1 + shift)
             # Update all points with the same x-coordinate
             for i, (x, y) in enumerate(corners):
                 if x == x1:
@@ -132,6 +232,7 @@ class JeepSet:
         # Apply valid mutation
         jeep.route = new_corners
         jeep.routeToRoutePoints()
+        self.mark_route_changed(jeep_idx)
 
         # Visualization callback if needed
         if visualize_callback:
@@ -1,4 +1,5 @@
 import heapq
+from array import array
 import math
 import random
 import grid
@@ -10,27 +11,319 @@ TRANSITION_PENALTY = 30
 TRANSFER_PENALTY = 30
 WALKING_SPEED = 50
 
-# Constants for boarding and alighting
-MIN_BOARDING_THRESHOLD = 20  # Minimum threshold regardless of dt
-BASE_BOARDING_THRESHOLD = 150  # Base threshold before dt multiplier
+# Journey action of each edge kind, used when splitting paths into legs
+EDGE_ACTIONS = {
+    "walk": "walk",
+    "transition": "board",
+    "jeep": "ride",
+    "alight": "alight",
+    "transfer": "transfer",
+    "complete_transfer": "transfer",
+}
+
+def last_transition_step(route, step, jeep_id):
+    """
+    Step of the last transition node of the ride on jeep_id that starts at
+    step, or None. The passenger alights at the node after it.
+    """
+    last_trans_idx = None
+    for idx in range(step, len(route)):
+        node = route[idx]
+        if isinstance(node, tuple) and len(node) == 3 and node[1] == 'transition':
+            if node[2] == jeep_id:
+                last_trans_idx = idx
+            elif last_trans_idx is not None:
+                # If we've found our last step and now we're seeing a different transition,
+                # that means we've reached the end of this jeep segment
+                break
+    return last_trans_idx
+
+class RoutePlan:
+    """
+    Immutable, integer-encoded form of a path, shared by every passenger
+    making the same trip; each passenger only keeps its own step in it.
+    Per step of the path:
+      points        grid point ID, x * (rows + 1) + y
+      screen        screen position
+      routes        route boarded there, or -1 unless it is a transition node
+      alight_steps  for transition nodes, last_transition_step of that ride, else -1
+      leg_ends      where the walk from that step ends: the next transition node, or the last step
+      cells         walking cells from the first step up to it
+    path keeps the original node tuples.
+    """
+
+    __slots__ = ('path', 'height', 'points', 'screen', 'routes', 'alight_steps', 'leg_ends', 'cells')
+
+    def __init__(self, path, grid_config=None):
+        grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+        self.path = tuple(path)
+        self.height = grid_config.max_y + 1
+        grid_points = [node[0] if len(node) == 3 else node for node in self.path]
+        self.points = array('l', [x * self.height + y for x, y in grid_points])
+        self.screen = tuple(grid_config.to_screen(*point) for point in grid_points)
+        self.routes = array('l', [node[2] if len(node) == 3 and node[1] == 'transition' else -1
+                                  for node in self.path])
+        self.alight_steps = array('l', [-1] * len(self.path))
+        for step, route_id in enumerate(self.routes):
+            if route_id >= 0:
+                self.alight_steps[step] = last_transition_step(self.path, step, route_id)
+
+        self.leg_ends = array('l', [len(self.path) - 1] * len(self.path))
+        for step in range(len(self.path) - 2, -1, -1):
+            self.leg_ends[step] = step + 1 if self.routes[step + 1] >= 0 else self.leg_ends[step + 1]
+        self.cells = array('l', [0])
+        for (x1, y1), (x2, y2) in zip(grid_points, grid_points[1:]):
+            self.cells.append(self.cells[-1] + abs(x2 - x1) + abs(y2 - y1))
+
+    def __len__(self):
+        return len(self.path)
+
+    def point(self, step):
+        """Grid point of the node at step."""
+        return divmod(self.points[step], self.height)
+
+class CompiledGraph:
+    """
+    Compressed sparse row (CSR) snapshot of a TravelGraph.
+    Grid point (x, y) has the integer ID x * (rows + 1) + y, and its walking
+    edges are generated from that ID during the search instead of stored.
+    Every other node gets an ID after the grid points. The stored edges
+    leaving node i are at positions offsets[i] to offsets[i + 1] of the flat
+    targets and costs arrays. xs/ys hold the grid point of every node
+    for A*.
+    """
+
+    def __init__(self, graph, grid_config=None):
+        grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+        self.max_x = grid_config.max_x
+        self.max_y = grid_config.max_y
+        self.height = self.max_y + 1
+        self.grid_nodes = (self.max_x + 1) * self.height
+        # Nodes other than grid points, in ID order from grid_nodes on.
+        # IDs and each node's edges follow a canonical order rather than the
+        # order edges were added in, so a graph patched by replace_jeep
+        # compiles exactly like a fresh build and breaks cost ties the same way.
+        self.extra_nodes = []
+        self.extra_ids = {}
+        nodes = set(graph)
+        for edges in graph.values():
+            nodes.update(neighbor for neighbor, _, _ in edges)
+        for node in sorted(nodes, key=repr):
+            self._add_node(node)
+        self.node_count = self.grid_nodes + len(self.extra_nodes)
+
+        all_int = isinstance(WALKING_COST, int) and all(
+            isinstance(cost, int) for edges in graph.values() for _, cost, _ in edges)
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self.costs = array('q' if all_int else 'd')
+        for node_id in range(self.node_count):
+            edges = sorted((self.node_id(neighbor), cost) for neighbor, cost, _ in graph.get(self.node(node_id), ()))
+            for neighbor_id, cost in edges:
+                self.targets.append(neighbor_id)
+                self.costs.append(cost)
+            self.offsets.append(len(self.targets))
+
+        self.xs = array('l', [x for x in range(self.max_x + 1) for _ in range(self.height)])
+        self.ys = array('l', list(range(self.height)) * (self.max_x + 1))
+        self.xs.extend(node[0][0] for node in self.extra_nodes)
+        self.ys.extend(node[0][1] for node in self.extra_nodes)
+
+        # Cheapest cost per cell of grid distance over the stored (transit)
+        # edges. Riding is JEEPNEY_COST per cell, but a route may skip cells,
+        # so the scale is measured rather than assumed to keep the A*
+        # heuristic admissible. The walking lattice costs WALKING_COST per cell.
+        self.heuristic_scale = min(JEEPNEY_COST, WALKING_COST)
+        xs, ys = self.xs, self.ys
+        for node_id in range(self.node_count):
+            for edge in range(self.offsets[node_id], self.offsets[node_id + 1]):
+                neighbor = self.targets[edge]
+                span = abs(xs[node_id] - xs[neighbor]) + abs(ys[node_id] - ys[neighbor])
+                if span > 0:
+                    self.heuristic_scale = min(self.heuristic_scale, self.costs[edge] / span)
+
+    def _add_node(self, node):
+        if self.node_id(node) is None:
+            self.extra_ids[node] = self.grid_nodes + len(self.extra_nodes)
+            self.extra_nodes.append(node)
+
+    def node_id(self, node):
+        """Integer ID of node, or None if the graph has no such node."""
+        if len(node) == 2:
+            x, y = node
+            if 0 <= x <= self.max_x and 0 <= y <= self.max_y:
+                return x * self.height + y
+        return self.extra_ids.get(node)
+
+    def node(self, node_id):
+        """Node with the given integer ID."""
+        if node_id < self.grid_nodes:
+            return divmod(node_id, self.height)
+        return self.extra_nodes[node_id - self.grid_nodes]
+
+    def walk_neighbors(self, node_id):
+        """IDs of the grid points one step from a grid point, in the order the old lattice stored them."""
+        x, y = divmod(node_id, self.height)
+        neighbors = []
+        if x > 0:
+            neighbors.append(node_id - self.height)
+        if x < self.max_x:
+            neighbors.append(node_id + self.height)
+        if y > 0:
+            neighbors.append(node_id - 1)
+        if y < self.max_y:
+            neighbors.append(node_id + 1)
+        return neighbors
+
+    def search(self, source, targets=None):
+        """
+        Dijkstra from the source ID, stopping once every target ID is settled.
+        Returns (dist, pred, expanded): lists indexed by node ID, where pred
+        is -1 for unreached nodes and for the source, and the number of nodes
+        expanded. Ties are settled in push order, so paths match the original
+        list-carrying search.
+        """
+        node_count = self.node_count
+        dist = [float('inf')] * node_count
+        pred = [-1] * node_count
+        settled = bytearray(node_count)
+        offsets, edge_targets, costs = self.offsets, self.targets, self.costs
+        grid_nodes, walk_neighbors = self.grid_nodes, self.walk_neighbors
+        remaining = None if targets is None else set(targets)
+
+        dist[source] = 0
+        heap = [(0, 0, source)]
+        unique_counter = 1
+        expanded = 0
+        while heap:
+            cost, _, node = heapq.heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            expanded += 1
+
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+
+            if node < grid_nodes:
+                new_cost = cost + WALKING_COST
+                for neighbor in walk_neighbors(node):
+                    if new_cost < dist[neighbor]:
+                        dist[neighbor] = new_cost
+                        pred[neighbor] = node
+                        heapq.heappush(heap, (new_cost, unique_counter, neighbor))
+                        unique_counter += 1
+
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = edge_targets[edge]
+                new_cost = cost + costs[edge]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    pred[neighbor] = node
+                    heapq.heappush(heap, (new_cost, unique_counter, neighbor))
+                    unique_counter += 1
+        return dist, pred, expanded
+
+    def search_astar(self, source, target):
+        """
+        A* from the source ID to the target ID with a Manhattan-distance
+        heuristic. Same return value as search().
+
+        A passenger on a jeep may ride the rest of the way at heuristic_scale
+        per cell. One on foot either walks all of it at WALKING_COST per cell
+        or first pays TRANSITION_PENALTY to board, which keeps the estimate of
+        grid nodes well above the transit bound and still consistent.
+        """
+        node_count = self.node_count
+        dist = [float('inf')] * node_count
+        pred = [-1] * node_count
+        settled = bytearray(node_count)
+        offsets, edge_targets, costs = self.offsets, self.targets, self.costs
+        grid_nodes, walk_neighbors = self.grid_nodes, self.walk_neighbors
+        xs, ys, scale = self.xs, self.ys, self.heuristic_scale
+        goal_x, goal_y = xs[target], ys[target]
+        walk_cost, board_cost = WALKING_COST, TRANSITION_PENALTY
+
+        def estimate(node):
+            cells = abs(xs[node] - goal_x) + abs(ys[node] - goal_y)
+            if node < grid_nodes:
+                return min(walk_cost * cells, board_cost + scale * cells)
+            return scale * cells
+
+        dist[source] = 0
+        heap = [(estimate(source), 0, source)]
+        unique_counter = 1
+        expanded = 0
+        while heap:
+            _, _, node = heapq.heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            expanded += 1
+            if node == target:
+                break
+
+            cost = dist[node]
+            if node < grid_nodes:
+                new_cost = cost + WALKING_COST
+                for neighbor in walk_neighbors(node):
+                    if new_cost < dist[neighbor]:
+                        dist[neighbor] = new_cost
+                        pred[neighbor] = node
+                        # estimate() of a grid node, inlined for the busiest loop
+                        cells = abs(xs[neighbor] - goal_x) + abs(ys[neighbor] - goal_y)
+                        walk, ride = walk_cost * cells, board_cost + scale * cells
+                        heapq.heappush(heap, (new_cost + (walk if walk < ride else ride), unique_counter, neighbor))
+                        unique_counter += 1
+
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = edge_targets[edge]
+                new_cost = cost + costs[edge]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    pred[neighbor] = node
+                    heapq.heappush(heap, (new_cost + estimate(neighbor), unique_counter, neighbor))
+                    unique_counter += 1
+        return dist, pred, expanded
+
+    def path(self, pred, target):
+        """Rebuild the node path to target from a predecessor list."""
+        path_ids = [target]
+        while pred[path_ids[-1]] != -1:
+            path_ids.append(pred[path_ids[-1]])
+        return [self.node(node_id) for node_id in reversed(path_ids)]
 
 class TravelGraph:
-    def __init__(self):
+    def __init__(self, grid_config=None, use_astar=False):
+        self.grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+        # node -> [(neighbor, cost, edge_type)] for every stored edge
         self.graph = {}
-        # Create basic walking grid
-        for x in range(17):
-            for y in range(17):
-                node = (x, y)
-                self.graph[node] = []
-                # Add walking edges
-                if x > 0:
-                    self.graph[node].append(((x-1, y), WALKING_COST, "walk"))
-                if x < 16:
-                    self.graph[node].append(((x+1, y), WALKING_COST, "walk"))
-                if y > 0:
-                    self.graph[node].append(((x, y-1), WALKING_COST, "walk"))
-                if y < 16:
-                    self.graph[node].append(((x, y+1), WALKING_COST, "walk"))
+        # node -> {neighbor: (cost, edge_type)}, kept in step with self.graph
+        self.edge_index = {}
+        # (origin, destination) -> (cost, path), filled by precompute_routes
+        self.route_table = {}
+        # (origin, destination) -> (cost, RoutePlan), built from the route table
+        self.plan_table = {}
+        self._compiled = None
+        # Single-pair searches use A* instead of uniform-cost search. The
+        # route table keeps one uniform-cost search per origin, which settles
+        # all of an origin's destinations for far fewer nodes than A* per pair
+        self.use_astar = use_astar
+        # Search statistics, for comparing Dijkstra and A*
+        self.searches = 0
+        self.expanded_nodes = 0
+        # jeep_id -> set of grid points the jeep stops at, and the reverse index
+        self.jeep_points = {}
+        self.point_jeeps = {}
+        # (point, from_jeep, to_jeep) of every transfer already in the graph
+        self.transfers = set()
+        # Nodes whose edge lists are shared with a copy of this graph
+        self._shared = set()
+        # The walking grid is implicit: every grid point walks to its four
+        # neighbors at WALKING_COST, and only jeep, transition and transfer
+        # edges are stored in self.graph
     
     def _create_transition_node(self, point, jeep_id):
         # Create a transition node for boarding a jeepney
@@ -40,22 +333,106 @@ class TravelGraph:
         # Create a transfer node between jeepneys
         return (point, 'transfer', (from_jeep_id, to_jeep_id))
     
+    @staticmethod
+    def _index_edges(edges):
+        # The first edge to a neighbor wins, like a linear scan of the list would
+        index = {}
+        for neighbor, cost, edge_type in edges:
+            if neighbor not in index:
+                index[neighbor] = (cost, edge_type)
+        return index
+
+    def _ensure_node(self, node):
+        if node not in self.graph:
+            self.graph[node] = []
+            self.edge_index[node] = {}
+
+    def _add_edge(self, node, neighbor, cost, edge_type):
+        """Append an edge and index it, copying the node's list first if it is shared with another graph."""
+        edges = self.graph.get(node)
+        if edges is None:
+            edges = self.graph[node] = []
+            index = self.edge_index[node] = {}
+        elif node in self._shared:
+            edges = self.graph[node] = list(edges)
+            index = self.edge_index[node] = dict(self.edge_index[node])
+            self._shared.discard(node)
+        else:
+            index = self.edge_index[node]
+        edges.append((neighbor, cost, edge_type))
+        if neighbor not in index:
+            index[neighbor] = (cost, edge_type)
+
+    def _remove_edges(self, node, should_remove):
+        """Drop the edges of node that match should_remove, without touching shared lists."""
+        edges = self.graph.get(node)
+        if edges is None:
+            return
+        self.graph[node] = [edge for edge in edges if not should_remove(edge)]
+        self.edge_index[node] = self._index_edges(self.graph[node])
+        self._shared.discard(node)
+
+    def _drop_node(self, node):
+        self.graph.pop(node, None)
+        self.edge_index.pop(node, None)
+        self._shared.discard(node)
+
+    def is_walk(self, node, neighbor):
+        """True if node and neighbor are adjacent grid points."""
+        if len(node) != 2 or len(neighbor) != 2:
+            return False
+        if not (self.grid_config.contains(*node) and self.grid_config.contains(*neighbor)):
+            return False
+        return abs(node[0] - neighbor[0]) + abs(node[1] - neighbor[1]) == 1
+
+    def get_edge(self, node, neighbor):
+        """(cost, edge_type) of the edge from node to neighbor, or None."""
+        if self.is_walk(node, neighbor):
+            return (WALKING_COST, "walk")
+        index = self.edge_index.get(node)
+        return None if index is None else index.get(neighbor)
+
+    def copy(self):
+        """
+        Copy of the graph that shares every edge list with this one until
+        either graph changes a node (copy-on-write), so unchanged routes are
+        never duplicated.
+        """
+        clone = TravelGraph.__new__(TravelGraph)
+        clone.grid_config = self.grid_config
+        clone.graph = dict(self.graph)
+        clone.edge_index = dict(self.edge_index)
+        clone.route_table = {}
+        clone.plan_table = {}
+        clone._compiled = None
+        clone.use_astar = self.use_astar
+        clone.searches = 0
+        clone.expanded_nodes = 0
+        clone.jeep_points = {jeep_id: set(points) for jeep_id, points in self.jeep_points.items()}
+        clone.point_jeeps = {point: list(jeep_ids) for point, jeep_ids in self.point_jeeps.items()}
+        clone.transfers = set(self.transfers)
+        # From now on both graphs must copy a list and its index before changing them
+        self._shared = set(self.graph)
+        clone._shared = set(self.graph)
+        return clone
+
     def addJeep(self, jeep_route, jeep_id):
         points = jeep_route.route_points
+        self._invalidate()
+        own_points = self.jeep_points.setdefault(jeep_id, set())
         
         # First, add all transition nodes (from grid point to jeepney)
         for point in points:
+            if point not in own_points:
+                own_points.add(point)
+                self.point_jeeps.setdefault(point, []).append(jeep_id)
 
             transition_node = self._create_transition_node(point, jeep_id)
             # Connect grid point to transition node (boarding)
-            if point in self.graph:
-                self.graph[point].append((transition_node, TRANSITION_PENALTY, "transition"))
-            else:
-                self.graph[point] = [(transition_node, TRANSITION_PENALTY, "transition")]
+            self._add_edge(point, transition_node, TRANSITION_PENALTY, "transition")
             
             # Create entry for transition node if it doesn't exist
-            if transition_node not in self.graph:
-                self.graph[transition_node] = []
+            self._ensure_node(transition_node)
         
         # Now add the jeepney route connections between transition nodes
         for i in range(len(points) - 1):
@@ -63,81 +440,189 @@ class TravelGraph:
             next_point = points[i + 1]
             current_transition = self._create_transition_node(current, jeep_id)
             next_transition = self._create_transition_node(next_point, jeep_id)
-            self.graph[current_transition].append((next_transition, JEEPNEY_COST, "jeep"))
-            self.graph[current_transition].append((current, 0, "alight"))
+            self._add_edge(current_transition, next_transition, JEEPNEY_COST, "jeep")
+            self._add_edge(current_transition, current, 0, "alight")
 
         # Close the Loop
         if len(points) > 1:
             first_transition = self._create_transition_node(points[0], jeep_id)
             last_transition  = self._create_transition_node(points[-1], jeep_id)
             # riding from the last stop back to the first stop
-            self.graph[last_transition].append((first_transition, JEEPNEY_COST, "jeep"))
+            self._add_edge(last_transition, first_transition, JEEPNEY_COST, "jeep")
 
         # Add option to alight at the last point
         last_point      = points[-1]
         last_transition = self._create_transition_node(last_point, jeep_id)
-        self.graph[last_transition].append((last_point, 0, "alight"))
+        self._add_edge(last_transition, last_point, 0, "alight")
+
+    def remove_jeep(self, jeep_id):
+        """Remove a jeep's transition, ride and transfer edges, leaving the rest of the graph intact."""
+        points = self.jeep_points.pop(jeep_id, set())
+        self._invalidate()
+
+        def is_own_transition(edge):
+            return edge[2] == "transition" and edge[0][2] == jeep_id
+
+        def is_transfer_with_jeep(edge):
+            return edge[2] == "transfer" and jeep_id in edge[0][2]
+
+        for point in points:
+            self._remove_edges(point, is_own_transition)
+            self._drop_node(self._create_transition_node(point, jeep_id))
+
+            jeep_ids = self.point_jeeps[point]
+            jeep_ids.remove(jeep_id)
+            for other_id in jeep_ids:
+                for transfer in ((point, jeep_id, other_id), (point, other_id, jeep_id)):
+                    if transfer in self.transfers:
+                        self.transfers.discard(transfer)
+                        self._drop_node(self._create_transfer_node(*transfer))
+                self._remove_edges(self._create_transition_node(point, other_id), is_transfer_with_jeep)
+            if not jeep_ids:
+                del self.point_jeeps[point]
+
+    def replace_jeep(self, jeep_route, jeep_id):
+        """Swap one jeep's route in place, including its transfers with every other jeep."""
+        self.remove_jeep(jeep_id)
+        self.addJeep(jeep_route, jeep_id)
+        for point in self.jeep_points[jeep_id]:
+            self._connect_transfers(point)
+
+    def _connect_transfers(self, point):
+        # Create transfer connections between all pairs of jeepneys at this point
+        jeep_ids = self.point_jeeps.get(point, ())
+        if len(jeep_ids) < 2:
+            return
+        for from_jeep in jeep_ids:
+            for to_jeep in jeep_ids:
+                if from_jeep != to_jeep:
+                    self._add_transfer(point, from_jeep, to_jeep)
+
+    def _add_transfer(self, point, from_jeep, to_jeep):
+        if (point, from_jeep, to_jeep) in self.transfers:
+            return
+        self.transfers.add((point, from_jeep, to_jeep))
+        from_transition = self._create_transition_node(point, from_jeep)
+        to_transition = self._create_transition_node(point, to_jeep)
+        
+        # Create transfer node
+        transfer_node = self._create_transfer_node(point, from_jeep, to_jeep)
+        
+        # Connect from transition -> transfer -> to transition
+        self._add_edge(from_transition, transfer_node, TRANSFER_PENALTY, "transfer")
+        self._add_edge(transfer_node, to_transition, 0, "complete_transfer")
     
     def add_transfer_connections(self):
-        # Add transfer nodes between different jeepney routes that share points
-        point_to_jeeps = {}
-        for node in self.graph:
-            if isinstance(node, tuple) and len(node) == 3 and node[1] == 'transition':
-                point, _, jeep_id = node
-                if point not in point_to_jeeps:
-                    point_to_jeeps[point] = []
-                point_to_jeeps[point].append(jeep_id)
-        
-        # For each point with multiple jeepneys, create transfer nodes
-        for point, jeep_ids in point_to_jeeps.items():
-            if len(jeep_ids) > 1:
-                # Create transfer connections between all pairs of jeepneys
-                for from_jeep in jeep_ids:
-                    for to_jeep in jeep_ids:
-                        if from_jeep != to_jeep:
-                            from_transition = self._create_transition_node(point, from_jeep)
-                            to_transition = self._create_transition_node(point, to_jeep)
-                            
-                            # Create transfer node
-                            transfer_node = self._create_transfer_node(point, from_jeep, to_jeep)
-                            
-                            # Add to graph if not exists
-                            if transfer_node not in self.graph:
-                                self.graph[transfer_node] = []
-                            
-                            # Connect from transition -> transfer -> to transition
-                            self.graph[from_transition].append((transfer_node, TRANSFER_PENALTY, "transfer"))
-                            self.graph[transfer_node].append((to_transition, 0, "complete_transfer"))
+        """
+        Add transfer nodes between different jeepney routes that share points.
+        Built from the point -> jeeps index kept by addJeep; transfers that
+        already exist are skipped, so calling this again is harmless.
+        """
+        self._invalidate()
+        for point in self.point_jeeps:
+            self._connect_transfers(point)
     
+    def compile(self):
+        """Return the CSR form of the graph, rebuilding it only after a change."""
+        if self._compiled is None:
+            self._compiled = CompiledGraph(self.graph, self.grid_config)
+        return self._compiled
+
+    def _invalidate(self):
+        # Any edge change makes the compiled graph and route table stale
+        self._compiled = None
+        self.route_table = {}
+        self.plan_table = {}
+
     def find_shortest_path(self, start, end):
-        # Create a custom tuple for the heap that ensures proper comparison
-        # The format is (cost, unique_id, node, path)
-        # The unique_id ensures we don't try to compare nodes directly
-        heap = [(0, 0, start, [start])]
-        visited = {}
-        unique_counter = 1
-        
-        while heap:
-            cost, _, node, path = heapq.heappop(heap)
-            
-            if node == end:
-                return (cost, path)
-            
-            if node in visited and visited[node] <= cost:
-                continue
-                    
-            visited[node] = cost
-            
-            for neighbor, weight, edge_type in self.graph.get(node, []):
-                new_cost = cost + weight
-                if neighbor not in visited or new_cost < visited[neighbor]:
-                    new_path = path + [neighbor]
-                    # Use unique_counter to ensure proper comparison in heap
-                    heapq.heappush(heap, (new_cost, unique_counter, neighbor, new_path))
-                    unique_counter += 1
-        
-        return (float('inf'), [])
+        if start == end:
+            return (0, [start])
+        compiled = self.compile()
+        start_id = compiled.node_id(start)
+        end_id = compiled.node_id(end)
+        if start_id is None or end_id is None:
+            return (float('inf'), [])
+
+        if self.use_astar:
+            dist, pred, expanded = compiled.search_astar(start_id, end_id)
+        else:
+            dist, pred, expanded = compiled.search(start_id, (end_id,))
+        self.searches += 1
+        self.expanded_nodes += expanded
+        if pred[end_id] == -1:
+            return (float('inf'), [])
+        return (dist[end_id], compiled.path(pred, end_id))
+
+    def find_shortest_paths(self, start, targets=None):
+        """
+        Single-source Dijkstra from start to many targets at once.
+        Returns {target: (cost, path)} for every target, or for every reachable
+        node if targets is None. Unreachable targets map to (inf, []).
+        The search stops as soon as all targets are settled.
+        """
+        compiled = self.compile()
+        start_id = compiled.node_id(start)
+        if start_id is None:
+            if targets is None:
+                return {start: (0, [start])}
+            return {target: (0, [start]) if target == start else (float('inf'), [])
+                    for target in targets}
+
+        target_ids = None
+        if targets is not None:
+            target_ids = [target_id for target_id in map(compiled.node_id, targets) if target_id is not None]
+        dist, pred, expanded = compiled.search(start_id, target_ids)
+        self.searches += 1
+        self.expanded_nodes += expanded
+
+        results = {}
+        if targets is None:
+            targets = [compiled.node(node_id) for node_id in range(compiled.node_count)
+                       if node_id == start_id or pred[node_id] != -1]
+        for target in targets:
+            target_id = compiled.node_id(target)
+            if target_id == start_id:
+                results[target] = (0, [start])
+            elif target_id is None or pred[target_id] == -1:
+                results[target] = (float('inf'), [])
+            else:
+                results[target] = (dist[target_id], compiled.path(pred, target_id))
+        return results
     
+    def precompute_routes(self, origins, destinations):
+        """
+        Fill the route table with every origin -> destination pair, using one
+        search per origin. Call it after the graph is complete; adding jeeps
+        or transfers afterwards clears the table.
+        """
+        destinations = list(destinations)
+        for origin in origins:
+            for destination, result in self.find_shortest_paths(origin, destinations).items():
+                self.route_table[(origin, destination)] = result
+
+    def precompute_area_routes(self, area_manager):
+        """Precompute routes between every residential and non-residential area, both ways."""
+        residential = [area.grid_position for area in area_manager.residential_areas]
+        non_residential = [area.grid_position for area in area_manager.non_residential_areas]
+        self.precompute_routes(residential, non_residential)
+        self.precompute_routes(non_residential, residential)
+
+    def get_route(self, origin, destination):
+        """(cost, path) from the route table, searching only on a miss."""
+        result = self.route_table.get((origin, destination))
+        if result is None:
+            result = self.find_shortest_path(origin, destination)
+            self.route_table[(origin, destination)] = result
+        return result
+
+    def get_plan(self, origin, destination):
+        """(cost, plan) for the trip, with one shared RoutePlan per trip; plan is None if there is no path."""
+        result = self.plan_table.get((origin, destination))
+        if result is None:
+            cost, path = self.get_route(origin, destination)
+            result = self.plan_table[(origin, destination)] = (cost, RoutePlan(path, self.grid_config) if path else None)
+        return result
+
     def analyze_path(self, path, print_details=False):
         if not path or len(path) < 2:
             return {"total_cost": float('inf')}
@@ -155,16 +640,10 @@ class TravelGraph:
             next_node = path[i + 1]
             
             # Find the edge between these nodes
-            edge_cost = None
-            edge_type = None
-            
-            for neighbor, cost, edge in self.graph.get(curr, []):
-                if neighbor == next_node:
-                    edge_cost = cost
-                    edge_type = edge
-                    break
+            edge = self.get_edge(curr, next_node)
             
-            if edge_cost is not None:
+            if edge is not None:
+                edge_cost, edge_type = edge
                 total_cost += edge_cost
                 
                 # Count segments
@@ -190,12 +669,8 @@ class TravelGraph:
             for i in range(len(path) - 1):
                 curr = path[i]
                 next_node = path[i + 1]
-                edge_info = "Unknown"
-                
-                for neighbor, cost, edge in self.graph.get(curr, []):
-                    if neighbor == next_node:
-                        edge_info = f"{edge} (cost: {cost})"
-                        break
+                edge = self.get_edge(curr, next_node)
+                edge_info = f"{edge[1]} (cost: {edge[0]})" if edge is not None else "Unknown"
                 
                 print(f"  {curr} -> {next_node}: {edge_info}")
         
@@ -205,42 +680,121 @@ class TravelGraph:
             "walking_segments": walking_segments,
             "transfers": transfers
         }
+
+    def analyze_paths(self, paths):
+        """
+        Split many paths into journey legs in a single pass over each path.
+        Returns one list of legs per path. A leg is a dict with the action
+        (walk, board, ride, alight or transfer), its from/to nodes, total cost
+        and edge count; consecutive walk or ride edges merge into one leg,
+        and the transfer edge pair becomes one transfer leg. Board and ride
+        legs carry jeep_id, transfer legs from_jeep and to_jeep.
+        """
+        get_edge = self.get_edge
+        all_legs = []
+        for path in paths:
+            legs = []
+            leg = None
+            for i in range(len(path) - 1):
+                curr = path[i]
+                next_node = path[i + 1]
+                edge = get_edge(curr, next_node)
+                if edge is None:
+                    leg = None
+                    continue
+                cost, edge_type = edge
+                action = EDGE_ACTIONS.get(edge_type, edge_type)
+
+                # Walks, rides on the same jeep and the two transfer edges extend the open leg
+                if (leg is not None and leg["action"] == action and action in ("walk", "ride", "transfer")
+                        and (action != "ride" or leg["jeep_id"] == curr[2])
+                        and (action != "transfer" or edge_type == "complete_transfer")):
+                    leg["to_node"] = next_node
+                    leg["cost"] += cost
+                    leg["edges"] += 1
+                    continue
+
+                leg = {"action": action, "from_node": curr, "to_node": next_node, "cost": cost, "edges": 1}
+                if action == "board":
+                    leg["jeep_id"] = next_node[2]
+                elif action == "ride":
+                    leg["jeep_id"] = curr[2]
+                elif action == "transfer" and edge_type == "transfer":
+                    leg["from_jeep"], leg["to_jeep"] = next_node[2]
+                legs.append(leg)
+            all_legs.append(legs)
+        return all_legs
+
 class Passenger:
-    def __init__(self, origin=None, destination=None):
-        self.real_time = 0.0
+    # Every attribute a passenger can have; slots keep each instance small
+    # and turn a misspelt attribute into an error instead of a new field
+    __slots__ = (
+        'origin', 'destination', 'plan', 'cost', 'current_step', 'position', 'speed',
+        'current_jeep', 'current_jeep_id', 'alight_point', 'alight_screen_pos', '_alight_step_index',
+        'pool', 'pool_slot', '_state',
+        'journey_time', 'simulation_time', 'real_time', 'spawn_time', 'wait_start',
+    )
+
+    def __init__(self, origin=None, destination=None, rng=None):
+        self.reset(origin, destination, rng)
+
+    def reset(self, origin=None, destination=None, rng=None):
+        """Start over as a fresh passenger, so a finished one can be reused."""
+        rng = random if rng is None else rng
         self.origin = origin
         self.destination = destination
-        self.route = []
+        # Shared RoutePlan of the trip; current_step is this passenger's place in it
+        self.plan = None
         self.cost = float('inf')
         self.current_step = 0
         self.position = None
         self.current_jeep = None
         self.current_jeep_id = None
         self.alight_point = None
-        self.speed = WALKING_COST + random.randint(-10, 10)
-        self.state = "waiting"
+        self.speed = WALKING_COST + rng.randint(-10, 10)
+        # PassengerPools holding this passenger, and its slot there
+        self.pool = None
+        self.pool_slot = 0
+        self._state = "waiting"
         self.journey_time = 0.0
         self.simulation_time = 0.0  # For commute metrics
         self.real_time = 0.0  # For penalties
         # Track where to alight once on a jeep
         self._alight_step_index = None
-        # Track boarding attempts
-        self.boarding_attempts = 0
-        self.last_boarding_check = 0
+        self.alight_screen_pos = None
+        # Simulated times the passenger spawned and last started waiting
+        self.spawn_time = 0.0
+        self.wait_start = 0.0
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, new_state):
+        if self.pool is not None:
+            self.pool.move(self, self._state, new_state)
+        self._state = new_state
+
+    @property
+    def route(self):
+        """Node tuples of the planned path, empty before planning."""
+        return () if self.plan is None else self.plan.path
 
     def plan_route(self, travel_graph):
         if not self.origin or not self.destination:
             return False
-        self.cost, self.route = travel_graph.find_shortest_path(self.origin, self.destination)
-        return bool(self.route)
+        self.cost, self.plan = travel_graph.get_plan(self.origin, self.destination)
+        return self.plan is not None
 
     def get_route_analysis(self, travel_graph):
         return travel_graph.analyze_path(self.route, print_details=True)
 
-    def set_random_trip(self, grid_size=17):
+    def set_random_trip(self, grid_config=None):
+        grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
         while True:
-            self.origin = (random.randint(0, grid_size - 1), random.randint(0, grid_size - 1))
-            self.destination = (random.randint(0, grid_size - 1), random.randint(0, grid_size - 1))
+            self.origin = (random.randint(0, grid_config.max_x), random.randint(0, grid_config.max_y))
+            self.destination = (random.randint(0, grid_config.max_x), random.randint(0, grid_config.max_y))
             if self.origin != self.destination:
                 break
     
@@ -250,197 +804,82 @@ class Passenger:
         self.destination = destination
 
     def update_position(self, travel_graph, dt, jeep_routes):
-        self.real_time += dt
-        if self.state == "arrived" or not self.route:
+        if self.state == "arrived" or self.plan is None:
             return
 
-        current_node = self.route[self.current_step]
-
-        if self.state == "waiting_jeep":
-            self._handle_jeep_boarding(current_node, jeep_routes, dt)
-        elif self.state == "on_jeep":
-            self._handle_jeep_ride(dt)  # Pass dt to alighting handler
+        if self.state in ("waiting_jeep", "on_jeep"):
+            return  # The jeep route boards and lets off passengers as its jeeps reach stops
         else:
-            self._handle_walking(travel_graph, current_node, dt)
+            self._handle_walking(dt, jeep_routes)
 
         
-    def _handle_walking(self, travel_graph, current_node, dt):
-        # If there is no "next" node, we've arrived ---
-        if self.current_step >= len(self.route) - 1:
-            self.state = "arrived"
-            return
-
-        # Get grid coordinates from current node (handles transition nodes)
-        if isinstance(current_node, tuple) and len(current_node) == 3:
-            grid_coords = current_node[0]
-        else:
-            grid_coords = current_node
-
+    def _handle_walking(self, dt, jeep_routes):
+        plan = self.plan
         # Initialize position with screen coordinates
         if self.position is None:
-            self.position = grid.get_grid_coors(*grid_coords)
+            self.position = plan.screen[self.current_step]
 
-        # Get next node's grid coordinates
-        next_node = self.route[self.current_step + 1]
-        if isinstance(next_node, tuple) and len(next_node) == 3:
-            target_grid = next_node[0]
-        else:
-            target_grid = next_node
-        
-        # Convert next node to screen coordinates
-        target_pos = grid.get_grid_coors(*target_grid)
-
-        # Calculate movement
-        dx = target_pos[0] - self.position[0]
-        dy = target_pos[1] - self.position[1]
-        distance = math.sqrt(dx**2 + dy**2)
-
-        if distance > 0:
-            step = self.speed * dt
-            ratio = min(step / distance, 1.0)
-            self.position = (
-                self.position[0] + dx * ratio,
-                self.position[1] + dy * ratio
-            )
-
-        if distance < 2:  # Reached node
-            self.current_step += 1
-            if isinstance(next_node, tuple) and len(next_node) == 3 and next_node[1] == 'transition':
-                self.state = "waiting_jeep"
-                self.boarding_attempts = 0  # Reset boarding attempts when newly waiting
-                
-    def _handle_jeep_boarding(self, current_node, jeep_routes, dt):
-        _, _, jeep_id = current_node
-        target_jeep = jeep_routes[jeep_id]
-        
-        # Don't check for boarding on every frame to improve performance and avoid too-frequent checks
-        self.last_boarding_check += dt
-        
-        # Check every 0.1 seconds, scaled by dt to handle different simulation speeds
-        if self.last_boarding_check < 0.1:
-            return
-            
-        self.last_boarding_check = 0  # Reset check timer
-        self.boarding_attempts += 1
-        
-        # Check distance to both jeeps on the route
-        closest_jeep_id = None
-        min_distance = float('inf')
-        
-        # Fixed minimum threshold + dynamic component based on dt
-        # At really slow speeds (dt ≈ 0), we still get at least MIN_BOARDING_THRESHOLD
-        threshold = MIN_BOARDING_THRESHOLD + (BASE_BOARDING_THRESHOLD * dt)
-        
-        # Increase threshold with boarding attempts to ensure passengers can board eventually
-        # This helps when simulation speeds are very low
-        if self.boarding_attempts > 10:
-            threshold += min(self.boarding_attempts - 10, 20)  # Add up to +20
-        
-        for i in range(2):  # Check both jeeps
-            # Calculate true distance
-            if target_jeep.jeepLocation[i] is None:
-                continue
-                
-            dx = target_jeep.jeepLocation[i][0] - self.position[0]
-            dy = target_jeep.jeepLocation[i][1] - self.position[1]
+        # Walk node to node until the step's distance is used up, so how
+        # long a walk takes does not depend on dt
+        budget = self.speed * dt
+        while True:
+            next_step = self.current_step + 1
+            # If there is no "next" node, we've arrived ---
+            if next_step >= len(plan.path):
+                self.state = "arrived"
+                return
+
+            target_pos = plan.screen[next_step]
+            dx = target_pos[0] - self.position[0]
+            dy = target_pos[1] - self.position[1]
             distance = math.sqrt(dx**2 + dy**2)
-            
-            if distance < min_distance:
-                min_distance = distance
-                closest_jeep_id = i
-
-        # Only board if closest jeep is near enough AND has capacity
-        if closest_jeep_id is not None and min_distance < threshold:
-            if target_jeep.passengerAmt[closest_jeep_id] < target_jeep.MAX_CAPACITY:
-                self.state = "on_jeep"
-                self.current_jeep = target_jeep
-                self.current_jeep_id = closest_jeep_id
-                self.current_jeep.modifyPassenger(1, closest_jeep_id)
-
-                # Find & stash the last 'transition' step for this jeep
-                last_trans_idx = None
-                for idx in range(self.current_step, len(self.route)):
-                    node = self.route[idx]
-                    if isinstance(node, tuple) and len(node) == 3 and node[1] == 'transition':
-                        if node[2] == jeep_id:
-                            last_trans_idx = idx
-                        elif last_trans_idx is not None:
-                            # If we've found our last step and now we're seeing a different transition,
-                            # that means we've reached the end of this jeep segment
-                            break
-
-                # Stash it for the ride handler
-                self._alight_step_index = last_trans_idx
-
-                # Compute exact alight coordinate and store the grid position
-                if last_trans_idx is not None and last_trans_idx + 1 < len(self.route):
-                    next_node = self.route[last_trans_idx + 1]
-                    alight_grid = next_node[0] if len(next_node) == 3 else next_node
-                    self.alight_point = alight_grid
-                    self.alight_screen_pos = grid.get_grid_coors(*alight_grid)
-                
-    def _handle_jeep_ride(self, dt):
-        # Update position to current jeep's location
-        self.position = self.current_jeep.jeepLocation[self.current_jeep_id]
-        
-        # Track current jeep position in grid coordinates
-        jeep_grid_pos = self.current_jeep.route_points[
-            self.current_jeep.current_route_index[self.current_jeep_id]
-        ]
-        
-        # Check if we're at the alighting point (grid-based rather than pixel-based)
-        # This is more reliable, especially at varying speeds
-        if self.alight_point and jeep_grid_pos == self.alight_point:
-            self._alight_from_jeep()
-            return
-            
-        # Also check if we passed our stop
-        if hasattr(self, 'alight_screen_pos'):
-            # Get previous grid position
-            prev_idx = (self.current_jeep.current_route_index[self.current_jeep_id] - 1) % len(self.current_jeep.route_points)
-            prev_grid_pos = self.current_jeep.route_points[prev_idx]
-            
-            # Get next grid position 
-            next_idx = (self.current_jeep.current_route_index[self.current_jeep_id] + 1) % len(self.current_jeep.route_points)
-            next_grid_pos = self.current_jeep.route_points[next_idx]
-            
-            # Check if alight point is between prev and next points on the route
-            passed_alight = False
-            
-            # If the jeep is moving horizontally (x-axis)
-            if prev_grid_pos[1] == jeep_grid_pos[1] == next_grid_pos[1]:
-                # Check if alight_point is on same y-coordinate
-                if self.alight_point[1] == jeep_grid_pos[1]:
-                    # Check if it's between prev and next x-coordinates (including wraparound)
-                    if ((prev_grid_pos[0] <= self.alight_point[0] <= next_grid_pos[0]) or 
-                        (next_grid_pos[0] <= self.alight_point[0] <= prev_grid_pos[0])):
-                        passed_alight = True
-                        
-            # If the jeep is moving vertically (y-axis)
-            elif prev_grid_pos[0] == jeep_grid_pos[0] == next_grid_pos[0]:
-                # Check if alight_point is on same x-coordinate
-                if self.alight_point[0] == jeep_grid_pos[0]:
-                    # Check if it's between prev and next y-coordinates (including wraparound)
-                    if ((prev_grid_pos[1] <= self.alight_point[1] <= next_grid_pos[1]) or 
-                        (next_grid_pos[1] <= self.alight_point[1] <= prev_grid_pos[1])):
-                        passed_alight = True
-            
-            if passed_alight:
-                self._alight_from_jeep()
+            if budget < distance:
+                ratio = budget / distance
+                self.position = (
+                    self.position[0] + dx * ratio,
+                    self.position[1] + dy * ratio
+                )
                 return
-    
-    def _alight_from_jeep(self):
-        """Helper method to handle alighting logic"""
+
+            # Reached node
+            self.position = target_pos
+            budget -= distance
+            self.current_step = next_step
+            jeep_id = plan.routes[next_step]
+            if jeep_id >= 0:  # A transition node: wait there for the jeep
+                self.state = "waiting_jeep"
+                jeep_routes[jeep_id].enqueue_passenger(self, plan.point(next_step))
+                return
+                
+    def board(self, jeep_route, jeep_id):
+        """Get on jeep jeep_id of jeep_route, which has reached this passenger's stop."""
+        self.state = "on_jeep"
+        self.current_jeep = jeep_route
+        self.current_jeep_id = jeep_id
+        self.current_jeep.modifyPassenger(1, jeep_id)
+
+        # The plan already knows the last 'transition' step of this ride; stash it for alight()
+        plan = self.plan
+        last_trans_idx = plan.alight_steps[self.current_step]
+        self._alight_step_index = last_trans_idx
+
+        # Exact alight coordinate and grid position
+        if last_trans_idx + 1 < len(plan):
+            self.alight_point = plan.point(last_trans_idx + 1)
+            self.alight_screen_pos = plan.screen[last_trans_idx + 1]
+            jeep_route.add_rider(self, jeep_id, self.alight_point)
+
+    def alight(self):
+        """Get off the current jeep, which has reached this passenger's alighting point."""
         self.current_jeep.modifyPassenger(-1, self.current_jeep_id)
         self.current_jeep = None
         self.current_jeep_id = None
-        self.current_step = self._alight_step_index + 1 if self._alight_step_index else len(self.route)
+        # -1 (or None before a first boarding) means the ride has no alight step
+        alight_step = self._alight_step_index
+        self.current_step = alight_step + 1 if alight_step is not None and alight_step >= 0 else len(self.plan)
         self.state = "walking"
-        # Reset boarding-related variables
-        self.boarding_attempts = 0
         # Place passenger exactly at alight point
-        if hasattr(self, 'alight_screen_pos'):
-            self.position = self.alight_screen_pos
+        self.position = self.alight_screen_pos
 
     def draw(self, screen):
         if self.state in ("on_jeep", "arrived"):
@@ -448,4 +887,27 @@ class Passenger:
         pygame.draw.rect(screen, (96, 96, 96),
                          (self.position[0] - 2,
                           self.position[1] - 2,
-                          5, 5))
\ No newline at end of file
+                          5, 5))
+
+class PassengerFreeList:
+    """
+    Passengers that finished their trip, kept for reuse. take() hands out
+    a reset passenger, recycling a finished one when there is one, and
+    give_back() takes passengers nothing refers to anymore.
+    """
+
+    def __init__(self):
+        self.free = []
+
+    def __len__(self):
+        return len(self.free)
+
+    def take(self, origin=None, destination=None, rng=None):
+        if self.free:
+            passenger = self.free.pop()
+            passenger.reset(origin, destination, rng)
+            return passenger
+        return Passenger(origin, destination, rng)
+
+    def give_back(self, passengers):
+        self.free.extend(passengers)
\ No newline at end of file
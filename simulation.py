@@ -0,0 +1,374 @@
+import math
+import random
+import grid
+from passenger import PassengerFreeList, TravelGraph
+from areas import AreaManager
+from jeeproute import JEEP_SPEED
+
+# Constants
+MAX_PASSENGERS = 10000
+BASE_SPAWN_RATE = 200
+SPEED_MULTIPLIERS = [0, 0.05, 1.0, 5.0, 25.0, 50.0, 100.0]
+FIXED_DT = 0.05  # Simulated seconds per step in fixed-timestep mode
+HEADLESS_DT = 1.0  # Simulated seconds per advance() in headless runs
+# Cells the fastest jeep may cover in one substep. Motion is exact for any
+# substep length, but events inside one substep are not ordered, so keep
+# each substep to about one stop per jeep
+SUBSTEP_CELLS = 1
+
+# Default city layout
+RESIDENTIAL_POSITIONS = [(2, 2), (3, 5), (4, 3), (5, 7), (6, 4),
+                         (0, 0), (0, 16), (16, 0), (16, 16), (0, 8), (8, 0)]
+NON_RESIDENTIAL_POSITIONS = [(10, 10), (12, 8), (13, 14), (15, 11), (11, 13),
+                             (16, 8), (8, 16), (0, 12), (12, 0), (16, 4), (4, 16)]
+
+class PassengerPools:
+    """Active passengers in walking, waiting, riding and arrived pools, moved by swap-remove."""
+
+    # Passenger.state -> pool
+    POOL_OF_STATE = {
+        "waiting": "walking",  # Not started yet; walks on its first update
+        "walking": "walking",
+        "waiting_jeep": "waiting",
+        "on_jeep": "riding",
+        "arrived": "arrived",
+    }
+
+    def __init__(self):
+        self.walking = []
+        self.waiting = []
+        self.riding = []
+        self.arrived = []
+        self.count = 0
+        # Time the pools have ticked; spawn_time and wait_start are readings of it
+        self.clock = 0.0
+        self.spawn_time_sum = 0.0
+        # {stop: {jeep_id: count}} for the waiting pool
+        self.waiting_counts = {}
+        # Waiting time of passengers who have boarded, the wait_start of those
+        # still waiting, and the most ever waiting at once
+        self.finished_wait = 0.0
+        self.wait_start_sum = 0.0
+        self.max_waiting = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for pool in (self.walking, self.waiting, self.riding, self.arrived):
+            yield from pool
+
+    def _pool(self, state):
+        return getattr(self, self.POOL_OF_STATE[state])
+
+    def append(self, passenger):
+        pool = self._pool(passenger.state)
+        passenger.pool = self
+        passenger.pool_slot = len(pool)
+        passenger.spawn_time = self.clock
+        pool.append(passenger)
+        self.count += 1
+        self.spawn_time_sum += self.clock
+
+    def move(self, passenger, old_state, new_state):
+        old_pool, new_pool = self._pool(old_state), self._pool(new_state)
+        if old_pool is new_pool:
+            return
+        last = old_pool.pop()
+        if last is not passenger:
+            old_pool[passenger.pool_slot] = last
+            last.pool_slot = passenger.pool_slot
+        passenger.pool_slot = len(new_pool)
+        new_pool.append(passenger)
+
+        if old_pool is self.waiting:
+            # Time spent waiting does not count towards the journey
+            waited = self.clock - passenger.wait_start
+            passenger.journey_time -= waited
+            self.finished_wait += waited
+            self.wait_start_sum -= passenger.wait_start
+            self._count_waiting(passenger, -1)
+        elif new_pool is self.waiting:
+            passenger.wait_start = self.clock
+            self.wait_start_sum += self.clock
+            self.max_waiting = max(self.max_waiting, len(self.waiting))
+            self._count_waiting(passenger, 1)
+
+    def _count_waiting(self, passenger, change):
+        plan, step = passenger.plan, passenger.current_step
+        point, jeep_id = plan.point(step), plan.routes[step]
+        jeep_counts = self.waiting_counts.setdefault(point, {})
+        jeep_counts[jeep_id] = jeep_counts.get(jeep_id, 0) + change
+        if not jeep_counts[jeep_id]:
+            del jeep_counts[jeep_id]
+            if not jeep_counts:
+                del self.waiting_counts[point]
+
+    def tick(self, dt):
+        """Advance every active passenger's time by dt."""
+        self.clock += dt
+
+    def active_time(self):
+        """Sum of the time every active passenger has spent in the system."""
+        return self.count * self.clock - self.spawn_time_sum
+
+    def total_wait(self):
+        """Time every passenger so far has spent waiting for a jeep."""
+        return self.finished_wait + len(self.waiting) * self.clock - self.wait_start_sum
+
+    def take_arrived(self):
+        """Remove and return every arrived passenger, with their times filled in."""
+        arrived, self.arrived = self.arrived, []
+        for passenger in arrived:
+            passenger.pool = None
+            passenger.real_time = self.clock - passenger.spawn_time
+            passenger.simulation_time = passenger.real_time
+            passenger.journey_time += passenger.real_time
+            self.spawn_time_sum -= passenger.spawn_time
+        self.count -= len(arrived)
+        return arrived
+
+class SimulationState:
+    def __init__(self):
+        self.speed_index = 2
+        self.active_passengers = PassengerPools()
+        # {stop: {jeep_id: count}}, kept up to date by the pools
+        self.waiting_passengers = self.active_passengers.waiting_counts
+        self.grid_cache = {}
+        self.metrics = {
+            'total_commute': 0.0,
+            'total_wait': 0.0,
+            'total_fitness': 0.0,
+            'completed': 0,
+            'total_spawned': 0,
+            'max_waiting': 0,
+        }
+        self.spawn_remainder = 0.0
+        self.current_speed = SPEED_MULTIPLIERS[self.speed_index]
+        self.target_speed = SPEED_MULTIPLIERS[self.speed_index]
+        # Tracking actual simulation time separately from real time
+        self.simulation_time = 0.0
+
+    def reset_metrics(self):
+        self.active_passengers = PassengerPools()
+        self.waiting_passengers = self.active_passengers.waiting_counts
+        self.spawn_remainder = 0.0
+        self.simulation_time = 0.0
+        # Counts stay ints, totals floats
+        self.metrics = {k: 0 if isinstance(v, int) else 0.0 for k, v in self.metrics.items()}
+
+    def active_time(self):
+        """Total time in system of every active passenger."""
+        return self.active_passengers.active_time()
+
+    def waiting_count(self):
+        return len(self.active_passengers.waiting)
+
+def create_area_manager(grid_config=None):
+    """
+    Build the AreaManager for the default city layout, stretched to fit
+    grid_config when it is not the default 16x16 grid.
+    """
+    grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+
+    def scale(positions):
+        return [(x * grid_config.max_x // grid.GRID_COLS, y * grid_config.max_y // grid.GRID_ROWS)
+                for x, y in positions]
+
+    area_manager = AreaManager(grid_config=grid_config)
+    area_manager.define_areas(scale(RESIDENTIAL_POSITIONS), scale(NON_RESIDENTIAL_POSITIONS))
+    return area_manager
+
+def build_travel_graph(jeep_set, area_manager=None):
+    """
+    Build a TravelGraph with every route of the set and its transfers.
+    With an area_manager, the area-to-area route table is precomputed too.
+    The graph is kept on the set; a set derived from a parent with a graph
+    copies it and only replaces the routes that changed.
+    """
+    travel_graph = jeep_set.travel_graph
+    if travel_graph is None:
+        if jeep_set.base_graph is not None:
+            travel_graph = jeep_set.base_graph.copy()
+            for idx in sorted(jeep_set.changed_routes):
+                travel_graph.replace_jeep(jeep_set[idx], idx)
+        else:
+            travel_graph = TravelGraph(grid_config=jeep_set.grid_config)
+            jeep_set.add_to_graph(travel_graph)
+            travel_graph.add_transfer_connections()
+        jeep_set.travel_graph = travel_graph
+        jeep_set.base_graph = None
+        jeep_set.changed_routes = set()
+
+    if area_manager is not None and not travel_graph.route_table:
+        travel_graph.precompute_area_routes(area_manager)
+    return travel_graph
+
+class Simulation:
+    """
+    Headless simulation engine.
+    Owns the state, jeep set, travel graph and areas, and advances them one
+    step at a time without a display, fonts or per-frame drawing.
+
+    With a seed, every load() reseeds one random.Random that drives jeep
+    placement, trip generation and walking speeds, so stepping the same
+    JeepSet with the same dt sequence is bit-for-bit reproducible.
+    """
+
+    # Passengers spawned per simulated minute, and the most alive at once
+    spawn_rate = BASE_SPAWN_RATE
+    max_passengers = MAX_PASSENGERS
+
+    def __init__(self, jeep_set=None, area_manager=None, state=None, seed=None, grid_config=None):
+        self.grid_config = grid.DEFAULT_GRID if grid_config is None else grid_config
+        self.state = state if state is not None else SimulationState()
+        self.area_manager = area_manager if area_manager is not None else create_area_manager(self.grid_config)
+        self.seed = seed
+        self.rng = random
+        # Finished passengers, reused by later spawns
+        self.free_passengers = PassengerFreeList()
+        self.jeep_set = None
+        self.routes = []
+        self.travel_graph = None
+        if jeep_set is not None:
+            self.load(jeep_set)
+
+    def load(self, jeep_set):
+        """Swap in a new individual, rebuild its travel graph and reset the metrics."""
+        self.rng = random.Random(self.seed) if self.seed is not None else random
+        previous = self.jeep_set
+        self.jeep_set = jeep_set
+        self.routes = jeep_set.routes
+        jeep_set.reset_jeeps(self.rng)
+        if previous is not None and previous is not jeep_set:
+            previous.clear_passengers()
+        self.travel_graph = build_travel_graph(jeep_set, self.area_manager)
+        # Neither the incoming nor the outgoing set's queues and manifests
+        # hold the previous individual's passengers anymore, so they can be reused
+        self.free_passengers.give_back(self.state.active_passengers)
+        self.state.reset_metrics()
+
+    def spawn_passengers(self, dt):
+        state = self.state
+        spawn_rate = self.spawn_rate / 60 * dt
+        spawn_count = int(spawn_rate + state.spawn_remainder)
+        state.spawn_remainder = spawn_rate + state.spawn_remainder - spawn_count
+
+        for _ in range(spawn_count):
+            if len(state.active_passengers) >= self.max_passengers:
+                break
+
+            orig, dest = self.area_manager.get_random_origin_destination_pair(self.rng)
+            if not orig or not dest:
+                continue
+
+            p = self.free_passengers.take(rng=self.rng)
+            p.set_trip_between_areas(orig, dest)
+            if not p.plan_route(self.travel_graph):
+                self.free_passengers.give_back((p,))
+            else:
+                p.position = p.plan.screen[0]
+                # Initialize simulation_time attribute for tracking total time in system
+                p.simulation_time = 0
+                state.active_passengers.append(p)
+                state.metrics['total_spawned'] += 1
+
+    def handle_completed_passengers(self):
+        state = self.state
+        completed = state.active_passengers.take_arrived()
+
+        for p in completed:
+            state.metrics['total_commute'] += p.real_time
+            state.metrics['total_fitness'] += 100 * math.exp(-p.journey_time/60)
+        state.metrics['completed'] += len(completed)
+        self.free_passengers.give_back(completed)
+        return len(completed)
+
+    def update_waiting_passengers(self):
+        # The pools keep the per-stop counts and the waiting totals exactly,
+        # so once per advance() is enough to bring the metrics up to date
+        state = self.state
+        pools = state.active_passengers
+        state.metrics['total_wait'] = pools.total_wait()
+        state.metrics['max_waiting'] = pools.max_waiting
+
+    def update_passengers(self, dt):
+        self.handle_completed_passengers()
+        pools = self.state.active_passengers
+
+        # Riders and waiting passengers only change state when a jeep
+        # reaches their stop. Walkers may move to another pool, so iterate
+        # over a copy.
+        for p in list(pools.walking):
+            p.update_position(self.travel_graph, dt, self.routes)
+        pools.tick(dt)
+
+    def step(self, dt):
+        """
+        Advance passengers and jeeps by dt simulated seconds. The waiting
+        metrics and per-stop counts are refreshed by advance().
+        """
+        self.state.simulation_time += dt
+
+        self.spawn_passengers(dt)
+        self.update_passengers(dt)
+
+        # Update jeeps using the same dt
+        self.jeep_set.step(dt)
+
+    def substeps(self, dt):
+        """
+        Fewest equal substeps of dt in which the fastest jeep covers at
+        most SUBSTEP_CELLS cells.
+        """
+        fastest = max(JEEP_SPEED, float(self.jeep_set.current_speed.max()))
+        cells = dt * fastest / (SUBSTEP_CELLS * self.grid_config.cell_size)
+        return max(1, math.ceil(cells - 1e-9))
+
+    def advance(self, dt, target_completed=None):
+        """
+        Advance by dt in substeps() steps, so a large dt plays out the same
+        as many small ones. Stops early once target_completed passengers
+        have arrived.
+        """
+        count = self.substeps(dt)
+        substep = dt / count
+        metrics = self.state.metrics
+        for _ in range(count):
+            self.step(substep)
+            if target_completed is not None and metrics['completed'] >= target_completed:
+                break
+        self.update_waiting_passengers()
+
+    def passenger_count(self):
+        """Number of passengers currently in the system."""
+        return len(self.state.active_passengers)
+
+    def fitness(self):
+        """Penalized fitness, as logged by GAManager.log_fitness."""
+        metrics = self.state.metrics
+        if metrics['completed'] == 0:
+            return 0.0
+        base_fit = metrics['total_fitness'] / metrics['completed']
+        penalty = 0.1 * metrics['max_waiting']
+        return max(0, base_fit - penalty)
+
+    def avg_commute(self):
+        """Average commute of completed passengers."""
+        metrics = self.state.metrics
+        if metrics['completed'] == 0:
+            return 0.0
+        return metrics['total_commute'] / metrics['completed']
+
+    def run(self, target_completed, dt=HEADLESS_DT, max_time=None):
+        """
+        Advance dt at a time until target_completed passengers have arrived
+        (or max_time simulated seconds have passed) and return
+        (fitness, avg_commute, completed).
+        """
+        state = self.state
+        while state.metrics['completed'] < target_completed:
+            if max_time is not None and state.simulation_time >= max_time:
+                break
+            self.advance(dt, target_completed)
+        return self.fitness(), self.avg_commute(), state.metrics['completed']
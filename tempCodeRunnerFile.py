@@ -77,106 +77,13 @@ jeep_set.add_to_graph(travel_graph)
 travel_graph.add_transfer_connections()
 
 # Initialize areas
-area_manager = AreaManager(grid_size=17)
+area_manager = AreaManager(grid_config=grid.DEFAULT_GRID)
 residential = [(2, 2), (3, 5), (4, 3), (5, 7), (6, 4),
                (0, 0), (0, 16), (16, 0), (16, 16), (0, 8), (8, 0)]
 non_residential = [(10, 10), (12, 8), (13, 14), (15, 11), (11, 13),
                    (16, 8), (8, 16), (0, 12), (12, 0), (16, 4), (4, 16)]
 area_manager.define_areas(residential, non_residential)
 
-# Patch Passenger._handle_jeep_boarding to be speed-aware without modifying passenger.py
-original_handle_jeep_boarding = Passenger._handle_jeep_boarding
-
-def patched_handle_jeep_boarding(self, current_node, jeep_routes):
-    """Patched version that's aware of simulation speed"""
-    _, _, jeep_id = current_node
-    target_jeep = jeep_routes[jeep_id]
-    
-    # Check distance to both jeeps on the route
-    closest_jeep_id = None
-    min_distance = float('inf')
-    
-    for i in range(2):  # Check both jeeps
-        dx = target_jeep.jeepLocation[i][0] - self.position[0]
-        dy = target_jeep.jeepLocation[i][1] - self.position[1]
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        if distance < min_distance:
-            min_distance = distance
-            closest_jeep_id = i
-
-    # Calculate boarding threshold based on simulation speed
-    # At higher speeds, jeeps move faster and can skip over passengers
-    # Increase the boarding radius to compensate
-    speed_factor = max(1.0, sim_state.current_speed / 5.0)
-    boarding_threshold = 15.0 * speed_factor
-    
-    # Only board if closest jeep is near enough AND has capacity
-    if min_distance < boarding_threshold:
-        if target_jeep.passengerAmt[closest_jeep_id] < target_jeep.MAX_CAPACITY:
-            self.state = "on_jeep"
-            self.current_jeep = target_jeep
-            self.current_jeep_id = closest_jeep_id  # Store which jeep we're on
-            self.current_jeep.modifyPassenger(1, closest_jeep_id)
-
-            # Find & stash the last 'transition' step for this jeep
-            last_trans_idx = None
-            for idx in range(self.current_step, len(self.route)):
-                node = self.route[idx]
-                if (isinstance(node, tuple) and len(node) == 3
-                        and node[1] == 'transition'
-                        and node[2] == jeep_id):
-                    last_trans_idx = idx
-
-            # Stash it for the ride handler
-            self._alight_step_index = last_trans_idx
-
-            # Compute exact alight coordinate
-            if last_trans_idx is not None and last_trans_idx + 1 < len(self.route):
-                alight_grid = self.route[last_trans_idx + 1]
-                self.alight_point = grid.get_grid_coors(*(
-                    alight_grid[0] if len(alight_grid) == 3 else alight_grid
-                ))
-
-# Apply the patch using monkey patching
-Passenger._handle_jeep_boarding = patched_handle_jeep_boarding
-
-original_handle_jeep_ride = Passenger._handle_jeep_ride
-
-def patched_handle_jeep_ride(self):
-    """Patched version that's aware of simulation speed"""
-    # Update position to current jeep's location
-    self.position = self.current_jeep.jeepLocation[self.current_jeep_id]
-    
-    if self.alight_point is not None:
-        # Get current jeep grid position and convert to screen coordinates
-        current_jeep_grid_pos = self.current_jeep.route_points[self.current_jeep.current_route_index[self.current_jeep_id]]
-        current_jeep_screen_pos = grid.get_grid_coors(*current_jeep_grid_pos)
-        
-        # Calculate distance to alighting point
-        dx = self.alight_point[0] - current_jeep_screen_pos[0]
-        dy = self.alight_point[1] - current_jeep_screen_pos[1]
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        # Calculate alighting threshold based on simulation speed
-        # Use the same approach as boarding to be consistent
-        speed_factor = max(1.0, sim_state.current_speed / 5.0)
-        alighting_threshold = 15.0 * speed_factor
-        
-        # Alight if close enough to destination point
-        if distance < alighting_threshold:
-            self.current_jeep.modifyPassenger(-1, self.current_jeep_id)
-            self.current_jeep = None
-            self.current_jeep_id = None  # Reset jeep ID
-
-            # Jump to just after the transition we alighted from
-            if self._alight_step_index is not None:
-                self.current_step = self._alight_step_index + 1
-            self.state = "walking"
-
-# Apply the patch using monkey patching
-Passenger._handle_jeep_ride = patched_handle_jeep_ride
-
 def format_time(seconds):
     return f"{int(seconds/60)}m {int(seconds%60)}s"
 
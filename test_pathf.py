@@ -63,8 +63,8 @@ def generate_test_case():
     # Generate random start and end points
     # Make sure they're not on the same spot
     while True:
-        start_x, start_y = random.randint(0, 16), random.randint(0, 16)
-        end_x, end_y = random.randint(0, 16), random.randint(0, 16)
+        start_x, start_y = random.randint(0, grid.DEFAULT_GRID.max_x), random.randint(0, grid.DEFAULT_GRID.max_y)
+        end_x, end_y = random.randint(0, grid.DEFAULT_GRID.max_x), random.randint(0, grid.DEFAULT_GRID.max_y)
         if (start_x, start_y) != (end_x, end_y):
             break
     
@@ -104,15 +104,9 @@ def analyze_journey(path, travel_graph):
         curr = path[i]
         next_node = path[i + 1]
         
-        # Find the edge between these nodes
-        edge_cost = None
-        edge_type = None
-        
-        for neighbor, cost, edge in travel_graph.graph.get(curr, []):
-            if neighbor == next_node:
-                edge_cost = cost
-                edge_type = edge
-                break
+        # Look up the edge between these nodes
+        edge = travel_graph.get_edge(curr, next_node)
+        edge_cost, edge_type = edge if edge is not None else (None, None)
         
         if edge_type == "walk":
             action_type = ACTION_WALK
@@ -552,5 +546,34 @@ def draw_point(screen, point, color, size):
     screen_point = grid.get_grid_coors(*point)
     pygame.draw.circle(screen, color, screen_point, size)
 
+def check_incremental_graphs(trials=30):
+    """Check that graphs patched from a parent's compile and route exactly like fresh builds."""
+    from jeepset import JeepSet
+    from simulation import build_travel_graph
+    points = grid.DEFAULT_GRID.points()
+    for trial in range(trials):
+        parent1, parent2 = JeepSet(), JeepSet()
+        build_travel_graph(parent1)
+        build_travel_graph(parent2)
+        child = JeepSet.crossover(parent1, parent2)[0]
+        if random.random() < 0.5:
+            child.mutate()
+        patched = build_travel_graph(child)
+        fresh = build_travel_graph(JeepSet.from_genome(child.genome()))
+
+        patched_csr, fresh_csr = patched.compile(), fresh.compile()
+        if (patched_csr.extra_nodes, patched_csr.offsets, patched_csr.targets, patched_csr.costs) != \
+                (fresh_csr.extra_nodes, fresh_csr.offsets, fresh_csr.targets, fresh_csr.costs):
+            print(f"Layout {trial}: the patched graph compiles differently from a fresh build")
+            return False
+        for origin in random.sample(points, 10):
+            if patched.find_shortest_paths(origin, points) != fresh.find_shortest_paths(origin, points):
+                print(f"Layout {trial}: routes from {origin} differ between the patched and fresh graphs")
+                return False
+    print(f"Patched and fresh graphs agree on {trials} layouts")
+    return True
+
 if __name__ == "__main__":
+    if "--check-incremental" in sys.argv:
+        sys.exit(0 if check_incremental_graphs() else 1)
     main()
\ No newline at end of file